@@ -1,9 +1,11 @@
 from importlib.metadata import version, PackageNotFoundError
 
 from .client import ouvrir_client, Client
-from .serveur import Serveur, lancer_serveur, mettre_constellation_à_jour, désinstaller_constellation
+from .grappe import ouvrir_grappe, ClientGrappe
+from .serveur import Serveur, lancer_serveur, mettre_constellation_à_jour, désinstaller_constellation, \
+    ouvrir_serveur, lancer_serveur_async, effacer_cache_installation
 from .sync import ClientSync
-from .utils import fais_rien, une_fois
+from .utils import fais_rien, une_fois, TableauVivant
 
 try:
     __version__ = version("constellationPy")
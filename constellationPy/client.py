@@ -1,32 +1,47 @@
 from __future__ import annotations
 
+import contextlib
 import inspect
 import json
 import logging
+import math
 import random
+import sys
+import time
 import urllib
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from typing import Optional, List, Any, Callable, Dict, Union, Tuple, Awaitable
+from typing import Optional, List, Any, Callable, Dict, Union, Tuple, Awaitable, Iterable, AsyncIterator
 from uuid import uuid4
 
+import pandas as pd
 import requests
 import trio
 import trio_websocket as tw
 
-from .const import LIEN_SIGNALEMENT_ERREURS
-from .serveur import obtenir_code_secret_contexte, obtenir_port_contexte
-from .utils import à_chameau, à_kebab, fais_rien_asynchrone, une_fois, tableau_exporté_à_pandas, attendre_stabilité
+if sys.version_info < (3, 11):
+    from exceptiongroup import ExceptionGroup
+
+from .const import LIEN_SIGNALEMENT_ERREURS, TAILLE_MAX_MESSAGE, TAILLE_MORCEAU_PANDAS, SEUIL_DÉCODAGE_FIL, \
+    TAILLE_MAX_CACHE
+from .serveur import obtenir_code_secret_contexte, obtenir_port_contexte, Serveur
+from .utils import à_chameau, à_kebab, fais_rien_asynchrone, une_fois, tableau_exporté_à_pandas, attendre_stabilité, \
+    sérialiser, désérialiser, pandas_à_constellation_par_morceaux
 
 
 # Idée de https://stackoverflow.com/questions/48282841/in-trio-how-can-i-have-a-background-task-that-lives-as-long-as-my-object-does
 @asynccontextmanager
-async def ouvrir_client(port: Optional[int] = None, code_secret: Optional[str] = None) -> Client:
+async def ouvrir_client(port: Optional[int] = None, code_secret: Optional[str] = None, **argsmc) -> Client:
     async with trio.open_nursery() as pouponnière:
-        async with Client(pouponnière, port, code_secret) as client:
+        async with Client(pouponnière, port, code_secret, **argsmc) as client:
             await client.connecter()
             yield client
 
 
+ERREUR_CONNEXION_PERDUE = "La connexion au serveur Constellation a été perdue."
+
+POLITIQUES_ITÉRATION = ["dernière", "abandonner_ancienne", "bloquer"]
+
 ErreurClientNonInitialisé = trio.ClosedResourceError(
     "Tout appel à un instance de `Client` doit avoir lieu dans un bloque de context ainsi :"
     "\n"
@@ -38,12 +53,113 @@ ErreurClientNonInitialisé = trio.ClosedResourceError(
 )
 
 
+class Distributeur(object):
+    # Livre les valeurs d'un suivi à sa fonction de suivi à partir d'une tâche à part, afin qu'une fonction de suivi
+    # lente ne bloque jamais la lecture des messages de la connexion.
+    def __init__(
+            soimême,
+            f: Callable[[Any], Union[None, Awaitable[None]]],
+            pouponnière: trio.Nursery,
+            limiteur: trio.CapacityLimiter,
+            taille_tampon: int,
+            séquentiel: bool = False,
+            f_fin: Optional[Callable[[], None]] = None
+    ):
+        soimême.f = f
+        soimême.séquentiel = séquentiel  # Attendre chaque fonction de suivi asynchrone avant de livrer la prochaine valeur
+        soimême.f_fin = f_fin
+        soimême.n_abandonnées = 0
+        soimême._envoi, soimême._réception = trio.open_memory_channel(max(1, taille_tampon))
+
+        pouponnière.start_soon(soimême._distribuer, pouponnière, limiteur)
+
+    def envoyer(soimême, données: Any) -> None:
+        try:
+            soimême._envoi.send_nowait(données)
+        except trio.WouldBlock:
+            # Tampon plein : chaque valeur d'un suivi remplace la précédente, donc on abandonne la plus ancienne.
+            soimême._réception.receive_nowait()
+            soimême.n_abandonnées += 1
+            soimême._envoi.send_nowait(données)
+        except trio.ClosedResourceError:
+            pass
+
+    def fermer(soimême) -> None:
+        soimême._envoi.close()
+
+    async def _distribuer(soimême, pouponnière: trio.Nursery, limiteur: trio.CapacityLimiter):
+        async with soimême._réception:
+            async for données in soimême._réception:
+                if inspect.iscoroutinefunction(soimême.f) and soimême.séquentiel:
+                    await soimême.f(données)
+                elif inspect.iscoroutinefunction(soimême.f):
+                    jeton = object()
+                    await limiteur.acquire_on_behalf_of(jeton)
+                    pouponnière.start_soon(soimême._rappel, données, limiteur, jeton)
+                else:
+                    soimême.f(données)
+        if soimême.f_fin:
+            soimême.f_fin()
+
+    async def _rappel(soimême, données: Any, limiteur: trio.CapacityLimiter, jeton: object):
+        try:
+            await soimême.f(données)
+        finally:
+            limiteur.release_on_behalf_of(jeton)
+
+
+class Connexion(object):
+    # Une des connexions websocket du client au serveur, avec ses statistiques. Les suivis lancés sur une connexion y
+    # restent (leurs fonctions de retour doivent passer par la même connexion) jusqu'à ce qu'ils soient oubliés.
+    def __init__(soimême, numéro: int):
+        soimême.numéro = numéro
+        soimême.ws: Optional[tw.WebSocketConnection] = None
+        soimême.connecté = trio.Event()
+        soimême.portée_écoute: Optional[trio.CancelScope] = None
+        soimême.suivis: set[str] = set()
+
+        soimême.messages_envoyés = 0
+        soimême.messages_reçus = 0
+        soimême.caractères_reçus = 0
+        soimême.reconnexions = 0
+
+    def statistiques(soimême) -> Dict[str, int]:
+        return {
+            "numéro": soimême.numéro,
+            "suivis": len(soimême.suivis),
+            "messages_envoyés": soimême.messages_envoyés,
+            "messages_reçus": soimême.messages_reçus,
+            "caractères_reçus": soimême.caractères_reçus,
+            "reconnexions": soimême.reconnexions,
+        }
+
+
 class Client(trio.abc.AsyncResource):
     def __init__(
             soimême,
             pouponnière: trio.Nursery,
             port: Optional[int] = None,
             code_secret: Optional[str] = None,
+            taille_tampon_suivi: int = 64,
+            rappels_simultanés: Optional[int] = None,
+            partager_suivis: bool = True,
+            taille_max_message: int = TAILLE_MAX_MESSAGE,
+            taille_file_messages: int = 1,
+            taille_tampon_réception: Optional[int] = None,
+            seuil_décodage_fil: Optional[int] = SEUIL_DÉCODAGE_FIL,
+            n_connexions: int = 1,
+            reconnecter: bool = False,
+            délai_reconnexion: float = 0.5,
+            délai_reconnexion_max: float = 30,
+            tentatives_reconnexion: Optional[int] = None,
+            renvoyer_actions: bool = True,
+            délai: Optional[float] = None,
+            durée_cache: Optional[float] = None,
+            taille_max_cache: int = TAILLE_MAX_CACHE,
+            fonctions_fusionnables: Optional[Iterable[str]] = None,
+            durée_mémo: Optional[float] = None,
+            taille_max_mémo: int = 1000,
+            serveur: Optional[Serveur] = None,
             _client_original: Optional[Client] = None,
             _liste_attributs: Optional[List[str]] = None
     ):
@@ -51,12 +167,73 @@ class Client(trio.abc.AsyncResource):
         soimême._client_original = _client_original or soimême
         soimême._port = port
         soimême._code_secret = code_secret
+        # Serveur à utiliser explicitement, plutôt que celui en contexte (p. ex., avec plusieurs serveurs à la fois)
+        soimême._serveur = serveur
+
+        # Nombre maximal de valeurs en attente par suivi, et de fonctions de suivi asynchrones exécutées à la fois
+        soimême.taille_tampon_suivi = taille_tampon_suivi
+        soimême._limiteur_rappels = trio.CapacityLimiter(rappels_simultanés or math.inf)
+        soimême._distributeurs: Dict[str, List[Distributeur]] = {}
+
+        # Les suivis identiques sont partagés : un seul suivi sur le serveur, dont les valeurs sont distribuées à chaque
+        # fonction de suivi locale.
+        soimême.partager_suivis = partager_suivis
+        soimême._suivis_partagés: Dict[Tuple, Dict] = {}
+
+        # Paramètres de la connexion websocket. Les messages fragmentés sont réassemblés par trio-websocket, jusqu'à
+        # concurrence de `taille_max_message` octets.
+        soimême.taille_max_message = taille_max_message
+        soimême.taille_file_messages = taille_file_messages
+        soimême.taille_tampon_réception = taille_tampon_réception
+
+        # Les messages plus grands que ce seuil sont décodés dans un fil à part (`None` pour toujours décoder sur place)
+        soimême.seuil_décodage_fil = seuil_décodage_fil
+
+        # Reconnexion automatique si la connexion au serveur est perdue. Les suivis actifs sont alors relancés sous leur
+        # `idRequête` original, et les actions en attente sont ou bien renvoyées, ou bien annulées avec une erreur.
+        soimême.reconnecter = reconnecter
+        soimême.délai_reconnexion = délai_reconnexion
+        soimême.délai_reconnexion_max = délai_reconnexion_max
+        soimême.tentatives_reconnexion = tentatives_reconnexion
+        soimême.renvoyer_actions = renvoyer_actions
+        soimême._actions_en_cours: Dict[str, Dict] = {}
+        soimême._suivis_actifs: Dict[str, Dict] = {}
+        soimême._fermé = False
+
+        # Avec plus d'une connexion, les actions passent par la première connexion et les suivis (dont les grands
+        # tableaux) sont répartis entre les autres, afin qu'un long message ne retarde jamais les petites requêtes.
+        soimême.n_connexions = max(1, n_connexions)
+        soimême._connexions: List[Connexion] = []
+        soimême._routes: Dict[str, Connexion] = {}
+
+        # Délai maximal (en secondes) pour obtenir la réponse du serveur à une requête. `None` pour attendre à jamais.
+        soimême.délai = délai
+        soimême.n_requêtes_expirées = 0
+
+        # Cache optionnel pour `obt_données_tableau` et `obt_données_tableau_nuée` : les suivis restent ouverts
+        # `durée_cache` secondes après la dernière lecture, et les moins récemment lus sont oubliés lorsque leurs
+        # valeurs dépassent `taille_max_cache` caractères (JSON) au total.
+        soimême.durée_cache = durée_cache
+        soimême.taille_max_cache = taille_max_cache
+        soimême._cache_suivis: OrderedDict[Tuple, Dict] = OrderedDict()
+
+        # Les appels simultanés identiques (même fonction, mêmes arguments) à ces actions (p. ex., "obtIdDispositif" ou
+        # "profil.obtNoms") sont fusionnés en une seule requête. Leurs résultats peuvent aussi être gardés en mémoire
+        # pendant `durée_mémo` secondes, jusqu'à concurrence de `taille_max_mémo` résultats. À n'utiliser que pour des
+        # actions sans effets secondaires !
+        soimême.fonctions_fusionnables = {
+            ".".join(à_chameau(x) for x in f.split(".")) for f in (fonctions_fusionnables or [])
+        }
+        soimême.durée_mémo = durée_mémo
+        soimême.taille_max_mémo = taille_max_mémo
+        soimême._actions_fusionnées: Dict[Tuple, Dict] = {}
+        soimême._mémo_actions: OrderedDict[Tuple, Tuple[float, Any]] = OrderedDict()
+        soimême.n_actions_fusionnées = 0
 
-        soimême._connexion: Optional[tw.WebSocketConnection] = None
         soimême._canaux: Optional[Tuple[trio.MemorySendChannel, trio.MemoryReceiveChannel]] = None
         soimême._canal_erreurs: Optional[trio.MemorySendChannel] = None
         soimême._liste_attributs = _liste_attributs or []
-        soimême._context_annuler_écoute: Optional[trio.CancelScope] = None
+        soimême._adresse_fonction = [à_chameau(x) for x in soimême._liste_attributs]
         soimême._écouteurs = {}
 
         soimême.erreurs: List[str] = []
@@ -65,7 +242,9 @@ class Client(trio.abc.AsyncResource):
     def port(soimême) -> int:
 
         # trouver le port
-        port = soimême._port or soimême._client_original._port or obtenir_port_contexte()
+        serveur = soimême._client_original._serveur
+        port_serveur = serveur.port if serveur else None
+        port = soimême._port or soimême._client_original._port or port_serveur or obtenir_port_contexte()
 
         if port is None:
             raise ValueError(
@@ -78,7 +257,10 @@ class Client(trio.abc.AsyncResource):
     def code_secret(soimême) -> int:
 
         # trouver le code_secret
-        code_secret = soimême._code_secret or soimême._client_original._code_secret or obtenir_code_secret_contexte()
+        serveur = soimême._client_original._serveur
+        code_secret_serveur = serveur.code_secret if serveur else None
+        code_secret = soimême._code_secret or soimême._client_original._code_secret or code_secret_serveur \
+            or obtenir_code_secret_contexte()
 
         logging.debug("code_secret")
         logging.debug(code_secret)
@@ -94,14 +276,15 @@ class Client(trio.abc.AsyncResource):
 
     @property
     def connexion(soimême) -> tw.WebSocketConnection:
-        connexion = soimême._client_original._connexion
-        if not connexion:
+        # La connexion principale, utilisée pour les actions
+        connexions = soimême._client_original._connexions
+        if not connexions or not connexions[0].ws:
             raise ErreurClientNonInitialisé
-        return connexion
+        return connexions[0].ws
 
-    @connexion.setter
-    def connexion(soimême, val):
-        soimême._client_original._connexion = val
+    @property
+    def statistiques_connexions(soimême) -> List[Dict[str, int]]:
+        return [c.statistiques() for c in soimême._client_original._connexions]
 
     @property
     def écouteurs(soimême):
@@ -115,16 +298,115 @@ class Client(trio.abc.AsyncResource):
     def canal_erreurs(soimême) -> trio.MemorySendChannel:
         return soimême._client_original._canal_erreurs
 
+    @property
+    def requêtes_en_cours(soimême) -> Dict[str, int]:
+        original = soimême._client_original
+        return {
+            "actions": len(original._actions_en_cours),
+            "suivis": len(original._suivis_actifs),
+            "écouteurs": len(original._écouteurs),
+            "expirées": original.n_requêtes_expirées,
+        }
+
+    def _limite_temps(soimême, délai: Optional[float]):
+        if délai is None:
+            return contextlib.nullcontext()
+
+        @contextlib.contextmanager
+        def limite():
+            try:
+                with trio.fail_after(délai):
+                    yield
+            except trio.TooSlowError:
+                soimême._client_original.n_requêtes_expirées += 1
+                raise
+
+        return limite()
+
     async def connecter(soimême, canal_erreurs: Optional[trio.MemorySendChannel] = None):
         # établir le canal pour les erreurs éventuelles
         soimême._canal_erreurs = canal_erreurs
 
-        # établir la connexion
+        # établir les connexions
+        soimême._connexions = [Connexion(i) for i in range(soimême.n_connexions)]
+        for connexion in soimême._connexions:
+            connexion.ws = await soimême._ouvrir_connexion()
+            connexion.connecté.set()
+
+            # démarrer l'écoute
+            connexion.portée_écoute = await soimême.pouponnière.start(soimême._écouter, connexion)
+
+    async def _ouvrir_connexion(soimême) -> tw.WebSocketConnection:
         url = f"ws://localhost:{soimême.port}?code={urllib.parse.quote_plus(soimême.code_secret)}"
-        soimême.connexion = await tw.connect_websocket_url(soimême.pouponnière, url)
+        options = {
+            "max_message_size": soimême.taille_max_message,
+            "message_queue_size": soimême.taille_file_messages,
+        }
+        if soimême.taille_tampon_réception:
+            # Uniquement disponible avec trio-websocket >= 0.12
+            options["receive_buffer_size"] = soimême.taille_tampon_réception
+        return await tw.connect_websocket_url(soimême.pouponnière, url, **options)
+
+    async def _reconnecter(soimême, connexion: Connexion) -> bool:
+        if not soimême.reconnecter or soimême._fermé:
+            return False
+
+        connexion.connecté = trio.Event()
+        délai = soimême.délai_reconnexion
+        tentative = 0
+        while soimême.tentatives_reconnexion is None or tentative < soimême.tentatives_reconnexion:
+            tentative += 1
+            await trio.sleep(délai)
+            try:
+                ws = await soimême._ouvrir_connexion()
+            except (OSError, tw.HandshakeError) as é:
+                logging.debug(f"Échec de reconnexion (tentative {tentative}) : {é}")
+                délai = min(délai * 2, soimême.délai_reconnexion_max)
+                continue
+
+            connexion.ws = ws
+
+            # Relancer les suivis de cette connexion, puis renvoyer (ou annuler) les actions en attente. La connexion
+            # peut de nouveau être perdue entre-temps ; on réessaie alors plus tard.
+            try:
+                for idRequête in list(connexion.suivis):
+                    if message := soimême._suivis_actifs.get(idRequête):
+                        await ws.send_message(sérialiser(message))
+                if connexion is soimême._connexions[0]:
+                    if soimême.renvoyer_actions:
+                        for message in list(soimême._actions_en_cours.values()):
+                            await ws.send_message(sérialiser(message))
+                    else:
+                        await soimême._annuler_actions_en_cours()
+            except tw.ConnectionClosed as é:
+                logging.debug(f"Connexion perdue pendant la reconnexion (tentative {tentative}) : {é}")
+                délai = min(délai * 2, soimême.délai_reconnexion_max)
+                continue
+
+            connexion.reconnexions += 1
+            logging.debug(f"Reconnecté au serveur Constellation après {tentative} tentative(s).")
+
+            connexion.connecté.set()
+            return True
+
+        return False
+
+    async def _annuler_requêtes(soimême, idsRequêtes: List[str]):
+        for idRequête in idsRequêtes:
+            if idRequête in soimême.écouteurs:
+                await soimême.écouteurs[idRequête](
+                    {"type": "erreur", "idRequête": idRequête, "erreur": ERREUR_CONNEXION_PERDUE}
+                )
+
+    async def _annuler_actions_en_cours(soimême):
+        await soimême._annuler_requêtes(list(soimême._actions_en_cours))
 
-        # démarrer l'écoute
-        soimême._context_annuler_écoute = await soimême.pouponnière.start(soimême._écouter)
+    async def _connexion_perdue(soimême, connexion: Connexion):
+        # Plus de reconnexion possible : les requêtes en attente échouent au lieu d'attendre à jamais,
+        # et les suivis s'arrêtent.
+        actions = list(soimême._actions_en_cours) if connexion is soimême._connexions[0] else []
+        await soimême._annuler_requêtes([*actions, *connexion.suivis])
+        connexion.connecté.set()  # Débloquer les envois en attente, qui échoueront
 
     def demander_code_secret(soimême, idRequête=None):
         idRequête = idRequête or f"Python - {random.randint(1000, 9999)}"
@@ -138,12 +420,24 @@ class Client(trio.abc.AsyncResource):
         if soimême is not soimême._client_original:
             return
 
-        if soimême._context_annuler_écoute:
-            soimême._context_annuler_écoute.cancel()
-
-        if soimême._connexion:
-            await soimême._connexion.aclose()
-            soimême._connexion = None
+        soimême._fermé = True
+        for connexion in soimême._connexions:
+            if connexion.portée_écoute:
+                connexion.portée_écoute.cancel()
+            if connexion.ws:
+                await connexion.ws.aclose()
+                connexion.ws = None
+        soimême._routes = {}
+
+        for distributeurs in soimême._distributeurs.values():
+            for distributeur in distributeurs:
+                distributeur.fermer()
+        soimême._distributeurs = {}
+        soimême._suivis_partagés = {}
+
+        for entrée in soimême._cache_suivis.values():
+            entrée["portée"].cancel()
+        soimême._cache_suivis.clear()
 
         soimême.écouteurs = {}
 
@@ -151,31 +445,55 @@ class Client(trio.abc.AsyncResource):
         soimême.écouteurs[idRequête] = f
 
     def _effacer_écouteur(soimême, idRequête: str):
-        soimême.écouteurs.pop(idRequête)
+        soimême.écouteurs.pop(idRequête, None)
 
-    async def _écouter(soimême, task_status=trio.TASK_STATUS_IGNORED):
+    async def _écouter(soimême, connexion: Connexion, task_status=trio.TASK_STATUS_IGNORED):
         with trio.CancelScope() as _context:
             task_status.started(_context)
             while True:
                 try:
-                    message = await soimême.connexion.get_message()
+                    message = await connexion.ws.get_message()
                 except tw.ConnectionClosed:
+                    if await soimême._reconnecter(connexion):
+                        continue
+                    await soimême._connexion_perdue(connexion)
                     break
-                logging.debug("Message ws reçu : " + json.dumps(json.loads(message), ensure_ascii=False))
-                m_json = json.loads(message)
+                connexion.messages_reçus += 1
+                connexion.caractères_reçus += len(message)
+                if logging.root.isEnabledFor(logging.DEBUG):
+                    logging.debug("Message ws reçu : " + message)
+                m_json = await soimême._décoder(message)
+                del message  # Libérer le texte brut (potentiellement énorme) avant de traiter le message
                 type_ = m_json["type"]
 
                 if "idRequête" in m_json and m_json["idRequête"] in soimême.écouteurs:
                     await soimême.écouteurs[m_json["idRequête"]](m_json)
 
-                if type_ == "erreur":
-                    # On rapporte ici uniquement les erreurs génériques (non spécifiques à une requête)
+                elif type_ == "erreur":
+                    # On rapporte ici uniquement les erreurs qui ne correspondent à aucune requête en cours.
+                    # Les erreurs d'une requête en attente sont soulevées dans la tâche qui a fait la requête,
+                    # afin qu'une mauvaise requête n'arrête pas la boucle d'écoute (et donc la connexion).
                     if "idRequête" in m_json and soimême.canal_erreurs:
                         m = {"erreur": m_json["erreur"]}
                         await soimême.canal_erreurs.send(json.dumps(m))
 
                     soimême._erreur(m_json["erreur"])
 
+    async def _décoder(soimême, message: str) -> Dict:
+        # Les petits messages, de loin les plus nombreux, sont décodés directement. Les grands messages sont décodés
+        # dans un fil à part afin de ne pas bloquer les autres tâches ; on attend tout de même le résultat avant de lire
+        # le prochain message, ce qui préserve l'ordre des messages.
+        seuil = soimême.seuil_décodage_fil
+        if seuil is not None and len(message) > seuil:
+            return await trio.to_thread.run_sync(désérialiser, message)
+        return désérialiser(message)
+
+    async def _signaler_erreur(soimême, e: str, message: Optional[str] = None) -> None:
+        if soimême.canal_erreurs:
+            await soimême.canal_erreurs.send(json.dumps({"erreur": e}))
+
+        soimême._erreur(message or e)
+
     def _erreur(soimême, e: str) -> None:
         soimême.erreurs.insert(0, e)
 
@@ -187,14 +505,56 @@ class Client(trio.abc.AsyncResource):
                 raise RuntimeError(e)
 
     async def _envoyer_message(soimême, message: Dict) -> None:
-        logging.debug("Message envoyé, " + json.dumps(message, ensure_ascii=False))
-        await soimême.connexion.send_message(json.dumps(message, ensure_ascii=False))
+        texte = sérialiser(message)
+        if logging.root.isEnabledFor(logging.DEBUG):
+            logging.debug("Message envoyé, " + texte)
+
+        original = soimême._client_original
+        connexion = soimême._choisir_connexion(message)
+        while True:
+            await connexion.connecté.wait()
+            ws = connexion.ws
+            if ws is None:
+                raise ErreurClientNonInitialisé
+            try:
+                await ws.send_message(texte)
+                connexion.messages_envoyés += 1
+                return
+            except tw.ConnectionClosed:
+                if not original.reconnecter or original._fermé:
+                    raise
+                if message["idRequête"] in original._actions_en_cours or message["idRequête"] in original._suivis_actifs:
+                    return  # Sera renvoyé lors de la reconnexion
+                if connexion.ws is ws:
+                    connexion.connecté = trio.Event()  # Attendre la reconnexion avant de réessayer
+
+    def _choisir_connexion(soimême, message: Dict) -> Connexion:
+        original = soimême._client_original
+        if not original._connexions:
+            raise ErreurClientNonInitialisé
+
+        idRequête = message["idRequête"]
+        if idRequête in original._routes:
+            return original._routes[idRequête]
+        if message["type"] != "suivre":
+            return original._connexions[0]
+
+        # Un nouveau suivi va sur la connexion dédiée aux suivis la moins chargée (ou sur la seule connexion)
+        connexion = min(original._connexions[1:] or original._connexions, key=lambda c: len(c.suivis))
+        connexion.suivis.add(idRequête)
+        original._routes[idRequête] = connexion
+        return connexion
+
+    def _libérer_route(soimême, idRequête: str) -> None:
+        if connexion := soimême._client_original._routes.pop(idRequête, None):
+            connexion.suivis.discard(idRequête)
 
     async def _appeler_fonction_action(
             soimême,
             idRequête: str,
             adresse_fonction: List[str],
-            args: Dict[str, Any]
+            args: Dict[str, Any],
+            délai: Optional[float] = None
     ) -> Any:
         message = {
             "type": "action",
@@ -205,39 +565,99 @@ class Client(trio.abc.AsyncResource):
 
         retour = {
             "prêt": trio.Event(),
-            "val": None
+            "val": None,
+            "erreur": None
         }
 
         async def f_suivi(v):
             if v["type"] == "action":
                 retour["val"] = v["résultat"] if "résultat" in v else None
-                retour["prêt"].set()
-                soimême._effacer_écouteur(idRequête)
             else:
-                soimême._erreur(
-                    "Valeur reçue : " + json.dumps(v, ensure_ascii=False, indent=2) +
-                    ". Avez-vous utilisé les bons arguments pour la fonction que vous venez d'appeler ?. \n"
-                    "Si vous êtes sûre que oui, c'est peut-être le serveur local Constellation qui est en grève. \n"
-                    "Si les négotiations n'aboutissent pas, n'hésitez pas à "
-                    "nous demander d'intervenir :\n"
-                    f"\t{LIEN_SIGNALEMENT_ERREURS}"
-                )
-                retour["val"] = None
-                retour["prêt"].set()
+                retour["erreur"] = v
+            retour["prêt"].set()
+            soimême._effacer_écouteur(idRequête)
+            original._actions_en_cours.pop(idRequête, None)
 
+        original = soimême._client_original
+        original._actions_en_cours[idRequête] = message
         soimême._enregistrer_écouteur(idRequête, f_suivi)
-        await soimême._envoyer_message(message)
-
-        await retour["prêt"].wait()
+        try:
+            with soimême._limite_temps(délai):
+                await soimême._envoyer_message(message)
+                await retour["prêt"].wait()
+        finally:
+            # En cas d'annulation ou de délai dépassé, on ne laisse pas traîner l'écouteur
+            if not retour["prêt"].is_set():
+                soimême._effacer_écouteur(idRequête)
+                original._actions_en_cours.pop(idRequête, None)
+
+        if retour["erreur"]:
+            # L'erreur est soulevée ici, dans la tâche qui a fait la requête, et non dans la boucle d'écoute
+            await soimême._signaler_erreur(
+                retour["erreur"].get("erreur"),
+                "Valeur reçue : " + json.dumps(retour["erreur"], ensure_ascii=False, indent=2) +
+                ". Avez-vous utilisé les bons arguments pour la fonction que vous venez d'appeler ?. \n"
+                "Si vous êtes sûre que oui, c'est peut-être le serveur local Constellation qui est en grève. \n"
+                "Si les négotiations n'aboutissent pas, n'hésitez pas à "
+                "nous demander d'intervenir :\n"
+                f"\t{LIEN_SIGNALEMENT_ERREURS}"
+            )
 
         return retour["val"]
 
+    async def _appeler_action_fusionnée(
+            soimême,
+            idRequête: str,
+            adresse_fonction: List[str],
+            args: Dict[str, Any],
+            délai: Optional[float] = None
+    ) -> Any:
+        original = soimême._client_original
+        clef = (tuple(adresse_fonction), sérialiser(args, trier=True))
+
+        if clef in original._mémo_actions:
+            expiration, valeur = original._mémo_actions[clef]
+            if trio.current_time() < expiration:
+                original._mémo_actions.move_to_end(clef)
+                original.n_actions_fusionnées += 1
+                return valeur
+            del original._mémo_actions[clef]
+
+        if en_cours := original._actions_fusionnées.get(clef):
+            with soimême._limite_temps(délai):
+                await en_cours["prêt"].wait()
+            if not en_cours["échec"]:
+                original.n_actions_fusionnées += 1
+                return en_cours["valeur"]
+            # Si la requête partagée a échoué, chacun refait la sienne afin que l'erreur soit soulevée au bon endroit
+            return await soimême._appeler_fonction_action(idRequête, adresse_fonction, args, délai=délai)
+
+        en_cours = {"prêt": trio.Event(), "valeur": None, "échec": True}
+        original._actions_fusionnées[clef] = en_cours
+        try:
+            valeur = await soimême._appeler_fonction_action(idRequête, adresse_fonction, args, délai=délai)
+            en_cours["valeur"], en_cours["échec"] = valeur, False
+        finally:
+            del original._actions_fusionnées[clef]
+            en_cours["prêt"].set()
+
+        if original.durée_mémo:
+            original._mémo_actions[clef] = (trio.current_time() + original.durée_mémo, valeur)
+            while len(original._mémo_actions) > original.taille_max_mémo:
+                original._mémo_actions.popitem(last=False)
+
+        return valeur
+
     async def _appeler_fonction_suivre(
             soimême,
             idRequête: str,
             adresse_fonction: List[str],
             args: Dict[str, any],
-            nom_arg_fonction: str
+            nom_arg_fonction: str,
+            délai: Optional[float] = None,
+            séquentiel: bool = False,
+            f_fin: Optional[Callable[[], None]] = None,
+            partager: Optional[bool] = None
     ) -> Union[Callable[[], Awaitable[None]], Dict[str, Callable[[Any], Awaitable[None]]]]:
 
         f = args.pop(nom_arg_fonction)
@@ -254,36 +674,106 @@ class Client(trio.abc.AsyncResource):
             "nomArgFonction": nom_arg_fonction
         }
 
+        original = soimême._client_original
+        partager = original.partager_suivis if partager is None else partager
+
+        def nouveau_distributeur() -> Distributeur:
+            return Distributeur(
+                f, soimême.pouponnière, original._limiteur_rappels, original.taille_tampon_suivi,
+                séquentiel=séquentiel, f_fin=f_fin
+            )
+
+        # Un suivi identique (même fonction, mêmes arguments) déjà en cours est partagé plutôt que relancé. Les suivis
+        # avec fonctions de retour (p. ex., `fChangerN`) ne sont jamais partagés.
+        clef = (tuple(adresse_fonction), nom_arg_fonction, sérialiser(args, trier=True))
+        if partager and (partagé := original._suivis_partagés.get(clef)):
+            with soimême._limite_temps(délai):
+                await partagé["prêt"].wait()
+            # Le suivi partagé a pu échouer ou être oublié entre-temps ; on en lance alors un nouveau.
+            if original._suivis_partagés.get(clef) is partagé and not partagé["fonctions"]:
+                distributeur = nouveau_distributeur()
+                original._distributeurs[partagé["idRequête"]].append(distributeur)
+                if "données" in partagé:
+                    distributeur.envoyer(partagé["données"])
+
+                async def f_oublier_partagé():
+                    await soimême._oublier_suivi(clef, partagé["idRequête"], distributeur)
+
+                return f_oublier_partagé
+
         retour = {
+            "idRequête": idRequête,
             "prêt": trio.Event(),
-            "statut": None
+            "statut": None,
+            "erreur": None,
+            "fonctions": None
         }
+        if partager:
+            original._suivis_partagés[clef] = retour
 
         async def f_suivi(val):
             if val["type"] == "suivrePrêt":
                 retour["statut"] = val
+                retour["fonctions"] = val.get("fonctions")
                 retour["prêt"].set()
-            elif val["type"] == "suivre":
-                if inspect.iscoroutinefunction(f):
-                    soimême.pouponnière.start_soon(f, val["données"])
+            elif val["type"] == "erreur":
+                if retour["prêt"].is_set():
+                    if val["erreur"] == ERREUR_CONNEXION_PERDUE:
+                        # Le suivi s'arrête simplement, comme si on l'avait oublié
+                        original._suivis_actifs.pop(idRequête, None)
+                        soimême._libérer_route(idRequête)
+                        soimême._effacer_écouteur(idRequête)
+                        soimême._retirer_suivi_partagé(clef, idRequête)
+                        for d in original._distributeurs.pop(idRequête, []):
+                            d.fermer()
+                    else:
+                        # Erreur survenue pendant le suivi
+                        await soimême._signaler_erreur(val["erreur"])
                 else:
-                    f(val["données"])
+                    retour["erreur"] = val["erreur"]
+                    retour["prêt"].set()
+            elif val["type"] == "suivre":
+                if partager:
+                    retour["données"] = val["données"]  # Pour les prochains abonnés à ce suivi
+                for d in original._distributeurs.get(idRequête, []):
+                    d.envoyer(val["données"])
 
+        distributeur = nouveau_distributeur()
+        original._distributeurs[idRequête] = [distributeur]
+
+        original._suivis_actifs[idRequête] = message
         soimême._enregistrer_écouteur(idRequête, f_suivi)
-        await soimême._envoyer_message(message)
 
         async def f_oublier():
-            message_oublier = {
-                "type": "retour",
-                "idRequête": idRequête,
-                "fonction": "fOublier"
-            }
-            await soimême._envoyer_message(message_oublier)
-            soimême._effacer_écouteur(idRequête)
-
-        await retour["prêt"].wait()
+            await soimême._oublier_suivi(clef, idRequête, distributeur)
+
+        try:
+            with soimême._limite_temps(délai):
+                await soimême._envoyer_message(message)
+                await retour["prêt"].wait()
+        except BaseException:
+            # Délai dépassé ou annulation : on nettoie, et on demande au serveur d'oublier le suivi au cas où
+            # il l'aurait tout de même lancé.
+            with trio.CancelScope(shield=True):
+                with trio.move_on_after(1):
+                    try:
+                        await f_oublier()
+                    except (tw.ConnectionClosed, trio.ClosedResourceError):
+                        pass
+            if idRequête not in original._distributeurs:
+                soimême._effacer_écouteur(idRequête)
+            retour["prêt"].set()  # Les abonnés qui attendaient ce suivi en lanceront un nouveau
+            raise
 
-        valeur_retour = retour["statut"]
+        if retour["erreur"]:
+            soimême._effacer_écouteur(idRequête)
+            original._suivis_actifs.pop(idRequête, None)
+            soimême._libérer_route(idRequête)
+            soimême._retirer_suivi_partagé(clef, idRequête)
+            for d in original._distributeurs.pop(idRequête, []):
+                d.fermer()
+            await soimême._signaler_erreur(retour["erreur"])
+            return fais_rien_asynchrone
 
         def générer_f_retour(nom: str):
             async def f_retour(*args_):
@@ -297,27 +787,117 @@ class Client(trio.abc.AsyncResource):
 
             return f_retour
 
-        if "fonctions" in valeur_retour and valeur_retour["fonctions"]:
+        if retour["fonctions"]:
+            soimême._retirer_suivi_partagé(clef, idRequête)
             return {
                 "fOublier": f_oublier,
-                **{fn: générer_f_retour(fn) for fn in valeur_retour["fonctions"]}
+                **{fn: générer_f_retour(fn) for fn in retour["fonctions"]}
             }
         return f_oublier
 
+    async def _oublier_suivi(soimême, clef: Tuple, idRequête: str, distributeur: Distributeur) -> None:
+        # Chaque fonction de suivi locale se désabonne à part ; le serveur n'oublie le suivi qu'au départ de la dernière.
+        original = soimême._client_original
+        distributeurs = original._distributeurs.get(idRequête, [])
+        if distributeur not in distributeurs:
+            return  # Déjà oublié
+        distributeurs.remove(distributeur)
+        distributeur.fermer()
+        if distributeurs:
+            return
+
+        original._distributeurs.pop(idRequête, None)
+        soimême._retirer_suivi_partagé(clef, idRequête)
+        if original._suivis_actifs.pop(idRequête, None) is None:
+            soimême._libérer_route(idRequête)
+            return  # Arrêté suite à la perte de la connexion
+        try:
+            await soimême._envoyer_message({
+                "type": "retour",
+                "idRequête": idRequête,
+                "fonction": "fOublier"
+            })
+        finally:
+            soimême._libérer_route(idRequête)
+        soimême._effacer_écouteur(idRequête)
+
+    def _retirer_suivi_partagé(soimême, clef: Tuple, idRequête: str) -> None:
+        suivis_partagés = soimême._client_original._suivis_partagés
+        if clef in suivis_partagés and suivis_partagés[clef]["idRequête"] == idRequête:
+            del suivis_partagés[clef]
+
+    async def ajouter_données_tableau(
+            soimême,
+            id_tableau: str,
+            données: Union[pd.DataFrame, List[Dict[str, Any]]],
+            taille_morceau: int = 1000,
+            fenêtre: int = 100,
+            f_progrès: Optional[Callable[[Dict[str, Union[int, float]]], Union[None, Awaitable[None]]]] = None
+    ) -> List[str]:
+        # Ajoute les rangées au tableau morceau par morceau ; chaque morceau est envoyé avec `en_lot`, avec au plus
+        # `fenêtre` ajouts en attente à la fois. Rend les empreintes des éléments ajoutés, dans l'ordre des rangées.
+        n_total = len(données)
+        empreintes: List[str] = []
+        début = time.monotonic()
+
+        if isinstance(données, pd.DataFrame):
+            morceaux = pandas_à_constellation_par_morceaux(données, taille_morceau)
+        else:
+            morceaux = (données[i:i + taille_morceau] for i in range(0, n_total, taille_morceau))
+
+        for rangées in morceaux:
+            i = len(empreintes)
+            résultats = await soimême.tableaux.ajouterÉlément.en_lot(
+                [{"id_tableau": id_tableau, "vals": r} for r in rangées], fenêtre=fenêtre
+            )
+            erreurs = [r for r in résultats if isinstance(r, Exception)]
+            if erreurs:
+                raise ExceptionGroup(
+                    f"Erreur lors de l'ajout des rangées {i} à {i + len(rangées) - 1} au tableau {id_tableau}. "
+                    f"Les {len(empreintes)} rangées précédentes ont été ajoutées.",
+                    erreurs
+                )
+            empreintes += résultats
+
+            if f_progrès:
+                durée = time.monotonic() - début
+                progrès = {
+                    "faits": len(empreintes),
+                    "total": n_total,
+                    "débit": len(empreintes) / durée if durée else math.inf  # Rangées par seconde
+                }
+                if inspect.iscoroutinefunction(f_progrès):
+                    await f_progrès(progrès)
+                else:
+                    f_progrès(progrès)
+
+        return empreintes
+
     async def obt_données_tableau(
             soimême,
             id_tableau: str,
             langues: Optional[str | list[str]] = None,
             formatDonnées="pandas",
-            patience: int | float = 1
+            patience: int | float = 1,
+            patience_min: Optional[int | float] = None,
+            délai_max: Optional[int | float] = None
     ):
+        # Sans cache, les données sont consommées lors de leur conversion ; le suivi ne doit donc pas être partagé avec
+        # d'autres lectures.
+        consommer = not soimême._client_original.durée_cache
+
         async def f_suivi(f):
-            return await soimême.tableaux.suivre_données_exportation(id_tableau=id_tableau, f=f, langues=langues)
+            return await soimême.tableaux.suivre_données_exportation(
+                id_tableau=id_tableau, f=f, langues=langues, _partager=False if consommer else None
+            )
 
-        données = await une_fois(f_suivi, soimême.pouponnière, attendre_stabilité(patience))
+        clef = ("obt_données_tableau", sérialiser([id_tableau, langues]))
+        données = await soimême._une_fois_en_cache(
+            clef, f_suivi, attendre_stabilité(patience, patience_min, délai_max)
+        )
 
         if formatDonnées.lower() == "pandas":
-            return tableau_exporté_à_pandas(données)
+            return tableau_exporté_à_pandas(données, taille_morceau=TAILLE_MORCEAU_PANDAS, consommer=consommer)
         elif formatDonnées.lower() == "constellation":
             return données
         else:
@@ -326,46 +906,242 @@ class Client(trio.abc.AsyncResource):
     async def obt_données_tableau_nuée(
             soimême, id_nuée: str, clef_tableau: str, n_résultats_désirés: int,
             langues: Optional[str | list[str]] = None, formatDonnées="pandas",
-            patience: int | float = 1
+            patience: int | float = 1, patience_min: Optional[int | float] = None,
+            délai_max: Optional[int | float] = None
     ):
+        consommer = not soimême._client_original.durée_cache
+
         async def f_suivi(f):
             return await soimême.nuées.suivre_données_exportation_tableau(
                 id_nuée=id_nuée, clef_tableau=clef_tableau,
                 langues=langues,
-                n_résultats_désirés=n_résultats_désirés, f=f
+                n_résultats_désirés=n_résultats_désirés, f=f,
+                _partager=False if consommer else None
             )
 
-        données = await une_fois(f_suivi, soimême.pouponnière, attendre_stabilité(patience))
+        clef = ("obt_données_tableau_nuée", sérialiser([id_nuée, clef_tableau, n_résultats_désirés, langues]))
+        données = await soimême._une_fois_en_cache(
+            clef, f_suivi, attendre_stabilité(patience, patience_min, délai_max)
+        )
 
         if formatDonnées.lower() == "pandas":
-            return tableau_exporté_à_pandas(données)
+            return tableau_exporté_à_pandas(données, taille_morceau=TAILLE_MORCEAU_PANDAS, consommer=consommer)
         elif formatDonnées.lower() == "constellation":
             return données
         else:
             raise ValueError(formatDonnées)
 
+    async def _une_fois_en_cache(
+            soimême,
+            clef: Tuple,
+            f_suivi: Callable[[Callable[[Any], Awaitable[None]]], Awaitable[Callable[[], Awaitable[None]]]],
+            fCond: Callable[[Any], Awaitable[bool]]
+    ) -> Any:
+        # Sans cache, équivaut à `une_fois`. Avec cache, le suivi reste ouvert après la première lecture et les
+        # lectures suivantes rendent immédiatement sa valeur la plus récente. Attention : la valeur rendue est partagée
+        # entre les lectures et ne doit donc pas être modifiée.
+        original = soimême._client_original
+        if not original.durée_cache:
+            return await une_fois(f_suivi, soimême.pouponnière, fCond)
+
+        cache = original._cache_suivis
+        entrée = cache.get(clef)
+        if entrée is None:
+            entrée = {
+                "valeur": None,
+                "stable": trio.Event(),
+                "oublier": None,
+                "expiration": math.inf,
+                "taille": 0,
+                "portée": trio.CancelScope()
+            }
+            cache[clef] = entrée
+
+            async def f(val):
+                entrée["valeur"] = val
+                if not entrée["stable"].is_set() and await fCond(val):
+                    entrée["stable"].set()
+
+            try:
+                entrée["oublier"] = await f_suivi(f)
+                await entrée["stable"].wait()
+            except BaseException:
+                with trio.CancelScope(shield=True):
+                    await soimême._retirer_du_cache(clef, entrée)
+                entrée["stable"].set()  # Les autres lectures en attente réessaieront
+                raise
+
+            # Taille approximative, évaluée une seule fois
+            entrée["taille"] = len(sérialiser(entrée["valeur"]))
+            if cache.get(clef) is not entrée:
+                # Retirée du cache entre-temps ; la valeur reste bonne pour cette lecture-ci
+                return entrée["valeur"]
+            soimême.pouponnière.start_soon(soimême._expirer_cache, clef, entrée)
+        else:
+            await entrée["stable"].wait()
+            if cache.get(clef) is not entrée:
+                return await soimême._une_fois_en_cache(clef, f_suivi, fCond)
+
+        entrée["expiration"] = trio.current_time() + original.durée_cache
+        cache.move_to_end(clef)
+
+        # Éviction des lectures les moins récentes, sauf celle-ci et celles qui attendent encore une valeur stable
+        taille_totale = sum(e["taille"] for e in cache.values())
+        for c, e in list(cache.items())[:-1]:
+            if taille_totale <= original.taille_max_cache:
+                break
+            if not e["stable"].is_set():
+                continue
+            taille_totale -= e["taille"]
+            e["expiration"] = -math.inf
+            e["portée"].cancel()
+            soimême.pouponnière.start_soon(soimême._retirer_du_cache, c, e)
+
+        return entrée["valeur"]
+
+    async def _expirer_cache(soimême, clef: Tuple, entrée: Dict) -> None:
+        with entrée["portée"]:
+            while trio.current_time() < entrée["expiration"]:
+                await trio.sleep_until(entrée["expiration"])
+            with trio.CancelScope(shield=True):
+                await soimême._retirer_du_cache(clef, entrée)
+
+    async def _retirer_du_cache(soimême, clef: Tuple, entrée: Dict) -> None:
+        cache = soimême._client_original._cache_suivis
+        if cache.get(clef) is entrée:
+            del cache[clef]
+        if entrée["oublier"]:
+            oublier, entrée["oublier"] = entrée["oublier"], None
+            try:
+                await oublier()
+            except (tw.ConnectionClosed, trio.ClosedResourceError):
+                pass
+
+    async def en_lot(
+            soimême,
+            appels: Iterable[Union[Dict[str, Any], Tuple[Union[str, List[str]], Dict[str, Any]]]],
+            fenêtre: int = 100
+    ) -> List[Any]:
+        # Chaque appel est ou bien un dictionnaire d'arguments pour la fonction présente
+        # (`client.tableaux.ajouterÉlément.en_lot([{...}, {...}])`), ou bien une paire (adresse de la fonction,
+        # arguments) (`client.en_lot([("tableaux.ajouterÉlément", {...})])`).
+        # Au plus `fenêtre` requêtes sont en attente d'une réponse à la fois. Les résultats sont rendus dans l'ordre des
+        # appels ; un appel qui échoue rend son erreur plutôt que d'interrompre les autres.
+        appels = list(appels)
+        résultats: List[Any] = [None] * len(appels)
+        à_faire = iter(enumerate(appels))
+
+        async def travailleur():
+            for i, appel in à_faire:
+                f = soimême
+                args = appel
+                if isinstance(appel, tuple):
+                    adresse, args = appel
+                    for x in (adresse.split(".") if isinstance(adresse, str) else adresse):
+                        f = getattr(f, x)
+                try:
+                    résultats[i] = await f(**args)
+                except Exception as é:
+                    résultats[i] = é
+
+        async with trio.open_nursery() as pouponnière:
+            for _ in range(min(max(1, fenêtre), len(appels))):
+                pouponnière.start_soon(travailleur)
+
+        return résultats
+
+    @asynccontextmanager
+    async def itérer(
+            soimême,
+            politique: str = "dernière",
+            taille: int = 1,
+            nom_arg_fonction: str = "f",
+            **argsmc: Any
+    ) -> AsyncIterator[trio.MemoryReceiveChannel]:
+        # Plutôt qu'une fonction de suivi, rend un canal à parcourir avec `async for`. Le suivi est oublié à la sortie du
+        # bloc `async with`. Les valeurs qui arrivent pendant que la boucle est occupée sont traitées selon `politique` :
+        # "dernière" ne garde que la valeur la plus récente ; "abandonner_ancienne" garde au plus `taille` valeurs et
+        # abandonne les plus anciennes ; "bloquer" attend que la boucle soit prête avant de livrer la prochaine valeur.
+        # Avec "bloquer", au-delà de `taille` + `taille_tampon_suivi` valeurs en attente, les plus anciennes sont tout de
+        # même abandonnées, comme pour toute fonction de suivi, afin de ne jamais bloquer la lecture de la connexion.
+        if politique not in POLITIQUES_ITÉRATION:
+            raise ValueError(f"Politique {politique} non reconnue. Politiques possibles : {POLITIQUES_ITÉRATION}")
+
+        envoi, réception = trio.open_memory_channel(1 if politique == "dernière" else max(1, taille))
+
+        if politique == "bloquer":
+            async def f(val):
+                try:
+                    await envoi.send(val)
+                except (trio.BrokenResourceError, trio.ClosedResourceError):
+                    pass  # La boucle est déjà terminée
+        else:
+            def f(val):
+                try:
+                    envoi.send_nowait(val)
+                except trio.WouldBlock:
+                    réception.receive_nowait()
+                    envoi.send_nowait(val)
+                except (trio.BrokenResourceError, trio.ClosedResourceError):
+                    pass
+
+        idRequête = str(uuid4())
+        délai = argsmc.pop("_délai", soimême._client_original.délai)
+        adresse_fonction = soimême._adresse_fonction
+        argsmc = {à_chameau(c): v for c, v in argsmc.items()}
+        argsmc[à_chameau(nom_arg_fonction)] = f
+
+        # Le canal est fermé lorsque le suivi s'arrête (p. ex., si la connexion est perdue), ce qui termine la boucle.
+        oublier = await soimême._appeler_fonction_suivre(
+            idRequête, adresse_fonction=adresse_fonction, args=argsmc, nom_arg_fonction=à_chameau(nom_arg_fonction),
+            délai=délai, séquentiel=True, f_fin=envoi.close
+        )
+        f_oublier = oublier["fOublier"] if isinstance(oublier, dict) else oublier
+
+        try:
+            async with réception:
+                yield réception
+        finally:
+            with trio.CancelScope(shield=True):
+                try:
+                    await f_oublier()
+                except (tw.ConnectionClosed, trio.ClosedResourceError):
+                    pass
+
     async def __call__(
             soimême,
             **argsmc: Any
     ) -> Union[Any, Callable[[], None]]:
 
         idRequête = str(uuid4())
+        # `_délai` (en secondes) n'est pas envoyé au serveur ; il remplace le délai par défaut du client pour cet appel.
+        # De même, `_partager` remplace `partager_suivis` pour un suivi.
+        délai = argsmc.pop("_délai", soimême._client_original.délai)
+        partager = argsmc.pop("_partager", None)
         nom_arg_fonction = next((c for c, v in argsmc.items() if callable(v)), None)
-        adresse_fonction = [à_chameau(x) for x in soimême._liste_attributs]
+        adresse_fonction = soimême._adresse_fonction
         argsmc = {à_chameau(c): v for c, v in argsmc.items()}
 
         if nom_arg_fonction is not None:
             return await soimême._appeler_fonction_suivre(
-                idRequête, adresse_fonction=adresse_fonction, args=argsmc, nom_arg_fonction=nom_arg_fonction
+                idRequête, adresse_fonction=adresse_fonction, args=argsmc, nom_arg_fonction=nom_arg_fonction,
+                délai=délai, partager=partager
+            )
+        elif ".".join(adresse_fonction) in soimême._client_original.fonctions_fusionnables:
+            return await soimême._appeler_action_fusionnée(
+                idRequête, adresse_fonction=adresse_fonction, args=argsmc, délai=délai
             )
         else:
             return await soimême._appeler_fonction_action(
-                idRequête, adresse_fonction=adresse_fonction, args=argsmc
+                idRequête, adresse_fonction=adresse_fonction, args=argsmc, délai=délai
             )
 
     def __getattr__(soimême, item):
-        return Client(
+        enfant = Client(
             soimême.pouponnière,
             _client_original=soimême._client_original,
             _liste_attributs=soimême._liste_attributs + [à_kebab(item)]
         )
+        # Gardé comme attribut ordinaire, afin que les prochains accès ne repassent plus par `__getattr__`
+        object.__setattr__(soimême, item, enfant)
+        return enfant
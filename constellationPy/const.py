@@ -9,3 +9,34 @@ PAQUET_SERVEUR = "@constl/serveur"
 
 # Le lien pour signaler des problèmes avec le logiciel Constellation
 LIEN_SIGNALEMENT_ERREURS = "https://github.com/reseau-constellation/serveur-ws/issues"
+
+# La taille maximale (en octets) d'un message websocket reçu du serveur. Les exportations de grands tableaux peuvent
+# être très volumineuses.
+TAILLE_MAX_MESSAGE = 256 * 2 ** 20
+
+# Nombre de rangées converties à la fois lors de la conversion de grands tableaux en format Pandas
+TAILLE_MORCEAU_PANDAS = 50_000
+
+# Nombre de rangées sérialisées à la fois pour calculer l'empreinte d'une valeur
+TAILLE_MORCEAU_EMPREINTE = 1000
+
+# Taille (en caractères) au-delà de laquelle les messages reçus sont décodés dans un fil d'exécution à part, afin de ne
+# pas bloquer la boucle trio
+SEUIL_DÉCODAGE_FIL = 2 ** 20
+
+# Taille maximale (en caractères JSON, approximativement) des valeurs gardées dans le cache des suivis du client
+TAILLE_MAX_CACHE = 256 * 2 ** 20
+
+# Une grappe de nœuds traite comme des lectures les fonctions dont le nom commence par l'un de ces préfixes
+PRÉFIXES_LECTURE = ("obt", "suivre", "rechercher")
+
+# Nombre de positions de chaque nœud sur l'anneau de hachage cohérent d'une grappe
+N_NŒUDS_VIRTUELS = 64
+
+# Nombre de lignes de stdout et stderr du serveur Constellation gardées en mémoire
+TAILLE_JOURNAL_SERVEUR = 1000
+
+# Durées (en secondes) de validité du cache sur disque de la version du serveur installé et des versions disponibles
+# sur npm
+DURÉE_CACHE_VERSION_SERVEUR = 24 * 60 * 60
+DURÉE_CACHE_VERSIONS_NPM = 60 * 60
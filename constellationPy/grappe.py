@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, List, Any, Dict, Tuple, Iterable, AsyncIterator, Set
+
+import trio
+import trio_websocket as tw
+
+from .client import ouvrir_client, Client
+from .const import PRÉFIXES_LECTURE, N_NŒUDS_VIRTUELS
+from .utils import à_chameau, à_kebab, sérialiser
+
+# Erreurs qui indiquent qu'un nœud ne répond plus (plutôt qu'une erreur dans la requête elle-même)
+ERREURS_NŒUD = (tw.ConnectionClosed, trio.TooSlowError, trio.ClosedResourceError, OSError)
+
+
+@asynccontextmanager
+async def ouvrir_grappe(
+        nœuds: Iterable[Tuple[int, str]],
+        nœud_écriture: int = 0,
+        intervalle_santé: float = 5,
+        délai_santé: float = 2,
+        délai_lecture: Optional[float] = 10,
+        **argsmc
+) -> AsyncIterator[ClientGrappe]:
+    # `nœuds` : liste de paires (port, code secret), une par nœud Constellation. Les autres arguments sont passés à
+    # `ouvrir_client` pour chaque nœud ; la reconnexion automatique est activée par défaut.
+    # Avec la reconnexion, une requête envoyée à un nœud tombé attendrait son retour ; les lectures sans délai explicite
+    # (`_délai` ou `délai`) échouent donc après `délai_lecture` secondes, et passent au prochain nœud.
+    argsmc = {"reconnecter": True, **argsmc}
+    async with contextlib.AsyncExitStack() as pile:
+        clients = [
+            await pile.enter_async_context(ouvrir_client(port, code_secret, **argsmc)) for port, code_secret in nœuds
+        ]
+        async with trio.open_nursery() as pouponnière:
+            grappe = ClientGrappe(
+                clients, pouponnière, nœud_écriture=nœud_écriture, intervalle_santé=intervalle_santé,
+                délai_santé=délai_santé, délai_lecture=délai_lecture
+            )
+            for i in range(len(clients)):
+                pouponnière.start_soon(grappe._surveiller, i)
+
+            try:
+                yield grappe
+            finally:
+                pouponnière.cancel_scope.cancel()
+
+
+class ClientGrappe(object):
+    # Répartit les requêtes entre plusieurs nœuds Constellation. Les lectures (suivis, et actions dont le nom commence
+    # par `obt`, `suivre` ou `rechercher`) vont au nœud désigné par hachage cohérent de l'identifiant visé (p. ex.,
+    # `id_tableau`), ou au prochain nœud en santé sur l'anneau. Les écritures vont toujours au nœud `nœud_écriture`.
+    def __init__(
+            soimême,
+            clients: List[Client],
+            pouponnière: trio.Nursery,
+            nœud_écriture: int = 0,
+            intervalle_santé: float = 5,
+            délai_santé: float = 2,
+            délai_lecture: Optional[float] = 10,
+            _grappe_originale: Optional[ClientGrappe] = None,
+            _liste_attributs: Optional[List[str]] = None
+    ):
+        soimême.clients = clients
+        soimême.pouponnière = pouponnière
+        soimême.nœud_écriture = nœud_écriture
+        soimême.intervalle_santé = intervalle_santé
+        soimême.délai_santé = délai_santé
+        soimême.délai_lecture = délai_lecture
+        soimême._grappe_originale = _grappe_originale or soimême
+        soimême._liste_attributs = _liste_attributs or []
+
+        if _grappe_originale is None:
+            soimême.santé: List[bool] = [True] * len(clients)
+            soimême._anneau: List[Tuple[int, int]] = sorted(
+                (_hacher(f"{i}:{v}"), i) for i in range(len(clients)) for v in range(N_NŒUDS_VIRTUELS)
+            )
+            soimême._abonnements: Dict[object, Dict[str, Any]] = {}
+
+    def _nœud_pour(soimême, clef: str, exclure: Optional[Set[int]] = None) -> int:
+        # Premier nœud en santé, dans le sens horaire, à partir de la position de la clef sur l'anneau
+        original = soimême._grappe_originale
+        exclure = exclure or set()
+        anneau = original._anneau
+        début = bisect.bisect(anneau, (_hacher(clef), -1))
+        for j in range(len(anneau)):
+            _, i = anneau[(début + j) % len(anneau)]
+            if original.santé[i] and i not in exclure:
+                return i
+        raise ConnectionError("Aucun nœud de la grappe Constellation n'est disponible.")
+
+    def _clef(soimême, argsmc: Dict[str, Any]) -> str:
+        # L'identifiant visé par la requête s'il y en a un ; sinon, la fonction et ses arguments
+        identifiant = next(
+            (v for c, v in argsmc.items() if à_chameau(c).startswith("id") and isinstance(v, str)), None
+        )
+        if identifiant is not None:
+            return identifiant
+        args = {c: v for c, v in argsmc.items() if not callable(v) and not c.startswith("_")}
+        return sérialiser([soimême._liste_attributs, args], trier=True)
+
+    async def _appeler(soimême, i: int, argsmc: Dict[str, Any]) -> Any:
+        f = soimême._grappe_originale.clients[i]
+        for x in soimême._liste_attributs:
+            f = getattr(f, x)
+        return await f(**argsmc)
+
+    async def _surveiller(soimême, i: int) -> None:
+        original = soimême._grappe_originale
+        while True:
+            await trio.sleep(original.intervalle_santé)
+            try:
+                with trio.fail_after(original.délai_santé):
+                    await original.clients[i].obtIdDispositif()
+                en_santé = True
+            except ERREURS_NŒUD:
+                en_santé = False
+
+            if en_santé and not original.santé[i]:
+                logging.info(f"Nœud {i} de la grappe Constellation rétabli.")
+                original.santé[i] = True
+            elif not en_santé:
+                await soimême._marquer_indisponible(i)
+
+    async def _marquer_indisponible(soimême, i: int) -> None:
+        # Qu'elle soit détectée par la surveillance ou par une requête, la perte d'un nœud déplace ses suivis
+        original = soimême._grappe_originale
+        if not original.santé[i]:
+            return
+        logging.info(f"Nœud {i} de la grappe Constellation indisponible.")
+        original.santé[i] = False
+        await soimême._basculer(i)
+
+    async def _basculer(soimême, i: int) -> None:
+        # Relance ailleurs les suivis du nœud indisponible
+        original = soimême._grappe_originale
+        for abonnement in [a for a in original._abonnements.values() if a["nœud"] == i]:
+            with trio.move_on_after(original.délai_santé):
+                try:
+                    await abonnement["oublier"]()
+                except ERREURS_NŒUD:
+                    pass
+            try:
+                nœud = soimême._nœud_pour(abonnement["clef"])
+                abonnement["oublier"] = await abonnement["grappe"]._appeler(nœud, abonnement["argsmc"])
+                abonnement["nœud"] = nœud
+            except ERREURS_NŒUD as é:
+                logging.warning(f"Impossible de relancer un suivi après la perte du nœud {i} : {é}")
+
+    def __getattr__(soimême, item):
+        enfant = ClientGrappe(
+            soimême.clients, soimême.pouponnière,
+            _grappe_originale=soimême._grappe_originale,
+            _liste_attributs=soimême._liste_attributs + [à_kebab(item)]
+        )
+        object.__setattr__(soimême, item, enfant)
+        return enfant
+
+    async def __call__(soimême, **argsmc: Any) -> Any:
+        original = soimême._grappe_originale
+        suivi = any(callable(v) for v in argsmc.values())
+        lecture = suivi or soimême._liste_attributs[-1].startswith(PRÉFIXES_LECTURE)
+
+        if not lecture:
+            if not original.santé[original.nœud_écriture]:
+                raise ConnectionError(
+                    f"Le nœud d'écriture ({original.nœud_écriture}) de la grappe Constellation n'est pas disponible."
+                )
+            return await soimême._appeler(original.nœud_écriture, argsmc)
+
+        clef = soimême._clef(argsmc)
+        if "_délai" not in argsmc and original.délai_lecture is not None \
+                and all(c.délai is None for c in original.clients):
+            argsmc = {**argsmc, "_délai": original.délai_lecture}
+
+        essayés = set()
+        while True:
+            nœud = soimême._nœud_pour(clef, exclure=essayés)
+            try:
+                résultat = await soimême._appeler(nœud, argsmc)
+                break
+            except ERREURS_NŒUD:
+                essayés.add(nœud)
+                await soimême._marquer_indisponible(nœud)
+
+        # Les suivis (sauf ceux avec fonctions de retour, liés à un nœud précis) sont relancés sur un autre nœud si le
+        # leur devient indisponible.
+        if suivi and callable(résultat):
+            jeton = object()
+            original._abonnements[jeton] = {
+                "nœud": nœud, "clef": clef, "argsmc": argsmc, "oublier": résultat, "grappe": soimême
+            }
+
+            async def f_oublier():
+                if abonnement := original._abonnements.pop(jeton, None):
+                    await abonnement["oublier"]()
+
+            return f_oublier
+        return résultat
+
+
+def _hacher(texte: str) -> int:
+    return int.from_bytes(hashlib.blake2b(texte.encode(), digest_size=8).digest(), "big")
@@ -1,14 +1,29 @@
+import contextvars
+import inspect
 import json
 import logging
+import math
+import os
 import platform
+import shutil
+import signal
+import socket
 import subprocess
-from functools import lru_cache
-from typing import Optional, TypedDict, Union, List, Tuple
-
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from hashlib import blake2b
+from functools import lru_cache, partial
+from typing import Optional, TypedDict, Union, List, Tuple, IO, Callable, Dict, Any, AsyncIterator
+
+import appdirs
+import trio
 import urllib3
 from semantic_version import SimpleSpec, Version
 
-from .const import V_SERVEUR_NÉCESSAIRE, PAQUET_SERVEUR, EXE_CONSTL
+from .const import V_SERVEUR_NÉCESSAIRE, PAQUET_SERVEUR, EXE_CONSTL, TAILLE_JOURNAL_SERVEUR, \
+    DURÉE_CACHE_VERSION_SERVEUR, DURÉE_CACHE_VERSIONS_NPM
 
 TypeExe = Union[str, List[str]]
 versions_serveur_compatibles = SimpleSpec(V_SERVEUR_NÉCESSAIRE)
@@ -18,15 +33,348 @@ class ErreurInstallationConstellation(ChildProcessError):
     pass
 
 
+class CacheInstallation(object):
+    # Cache sur disque des vérifications d'installation (versions du serveur et du registre npm), qui coûtent chacune
+    # le lancement de Node.js ou une requête réseau. Partagé entre les processus Python.
+    def __init__(soimême, fichier: Optional[str] = None):
+        soimême.fichier = fichier or os.path.join(appdirs.user_cache_dir("constellationPy"), "installation.json")
+
+    def _lire(soimême) -> Dict[str, Any]:
+        return _lire_json(soimême.fichier) or {}
+
+    def obtenir(soimême, clef: str, durée: float) -> Optional[Dict[str, Any]]:
+        entrée = soimême._lire().get(clef)
+        if entrée and time.time() - entrée["horodatage"] < durée:
+            return entrée
+
+    def changer(soimême, clef: str, valeur: Optional[Dict[str, Any]]) -> None:
+        contenu = soimême._lire()
+        if valeur is None:
+            contenu.pop(clef, None)
+        else:
+            contenu[clef] = {**valeur, "horodatage": time.time()}
+        try:
+            _écrire_json(soimême.fichier, contenu)
+        except OSError as é:
+            logging.debug(f"Impossible d'écrire le cache d'installation : {é}")
+
+    def effacer(soimême) -> None:
+        try:
+            os.remove(soimême.fichier)
+        except FileNotFoundError:
+            pass
+
+
+cache_installation = CacheInstallation()
+
+
+def effacer_cache_installation() -> None:
+    cache_installation.effacer()
+
+
+def _lire_json(fichier: str) -> Optional[Any]:
+    try:
+        with open(fichier, encoding="utf-8") as d:
+            return json.load(d)
+    except (OSError, ValueError):
+        return None
+
+
+def _écrire_json(fichier: str, contenu: Any) -> None:
+    # Écriture atomique : les autres processus voient soit l'ancien contenu, soit le nouveau. Le fichier n'est lisible
+    # que par l'utilisateur, car il peut contenir un code secret.
+    os.makedirs(os.path.dirname(os.path.abspath(fichier)), exist_ok=True)
+    tempo = f"{fichier}.{os.getpid()}.{threading.get_ident()}"
+    with open(os.open(tempo, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as d:
+        json.dump(contenu, d, ensure_ascii=False)
+    os.replace(tempo, fichier)
+
+
+def _empreinte_exe(exe: List[str]) -> List[Tuple[str, float]]:
+    # Les chemins (et dates de modification) de l'exécutable et des fichiers passés en argument, afin que le cache soit
+    # invalidé si l'un d'eux change.
+    empreinte = []
+    for x in exe:
+        chemin = x if os.path.isfile(x) else shutil.which(x)
+        if chemin:
+            empreinte.append((os.path.realpath(chemin), os.stat(chemin).st_mtime))
+    return empreinte
+
+
+class JournalServeur(object):
+    # Les dernières lignes écrites par le serveur Constellation sur stdout et stderr. Les deux flux sont lus en continu
+    # (sur des fils d'exécution à part), afin que le serveur ne bloque jamais en écrivant dans un tuyau plein.
+    def __init__(soimême, taille: int = TAILLE_JOURNAL_SERVEUR, niveau_logging: Optional[int] = logging.DEBUG):
+        soimême.lignes: deque[Tuple[str, str]] = deque(maxlen=taille)
+        soimême.niveau_logging = niveau_logging  # `None` pour ne rien envoyer à `logging`
+
+    def ajouter(soimême, flux: str, ligne: str) -> None:
+        ligne = ligne.rstrip("\r\n")
+        soimême.lignes.append((flux, ligne))
+        if soimême.niveau_logging is not None:
+            logging.log(soimême.niveau_logging, f"Message du serveur ({flux}) : {ligne}")
+
+    def obtenir(soimême, flux: Optional[str] = None) -> List[str]:
+        return [ligne for f, ligne in list(soimême.lignes) if flux is None or f == flux]
+
+    def vider(soimême, tuyau: IO[str], flux: str) -> threading.Thread:
+        def f_fil():
+            try:
+                for ligne in iter(tuyau.readline, ''):
+                    soimême.ajouter(flux, ligne)
+            except (ValueError, OSError):
+                pass  # Tuyau fermé
+
+        fil = threading.Thread(target=f_fil, name=f"Serveur Constellation ({flux})", daemon=True)
+        fil.start()
+        return fil
+
+    def suivre(soimême, fichier: str, flux: str, processus: subprocess.Popen, position: int = 0) -> threading.Thread:
+        # Comme `vider`, pour un serveur détaché qui écrit dans un fichier plutôt que dans un tuyau. S'arrête avec le
+        # processus.
+        def f_fil():
+            with open(fichier, "rb") as d:
+                d.seek(position)
+                lecteur = LecteurFichier(d)
+                while (ligne := lecteur.lire_ligne()) is not None or processus.poll() is None:
+                    if ligne is None:
+                        time.sleep(.1)
+                    else:
+                        soimême.ajouter(flux, ligne)
+
+        fil = threading.Thread(target=f_fil, name=f"Serveur Constellation ({flux})", daemon=True)
+        fil.start()
+        return fil
+
+
+class LecteurFichier(object):
+    # Lit les lignes complètes d'un fichier auquel un autre processus est en train d'écrire
+    def __init__(soimême, d: IO[bytes]):
+        soimême.d = d
+        soimême._reste = b""
+
+    def lire_ligne(soimême) -> Optional[str]:
+        soimême._reste += soimême.d.readline()
+        if not soimême._reste.endswith(b"\n"):
+            return None  # Rien de nouveau, ou ligne incomplète pour l'instant
+        ligne, soimême._reste = soimême._reste, b""
+        return ligne.decode("utf-8", errors="replace")
+
+    def position(soimême) -> int:
+        return soimême.d.tell() - len(soimême._reste)
+
+
 def lancer_serveur(
         port=None,
         autoinstaller=True,
         dossier: Optional[str] = None,
-        exe: TypeExe = EXE_CONSTL
+        exe: TypeExe = EXE_CONSTL,
+        journal: Optional[JournalServeur] = None,
+        délai: Optional[float] = None,
+        f_progrès: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Tuple[subprocess.Popen, int, str]:
+    # Si le serveur n'est pas prêt après `délai` secondes, le processus est arrêté et on soulève `TimeoutError`.
+    # `f_progrès` est appelée avec chaque ligne écrite par le serveur en attendant qu'il soit prêt.
+    if isinstance(exe, str):
+        exe = [exe]
+
+    _assurer_installation(exe, autoinstaller)
+
+    p = subprocess.Popen(
+        _commande_serveur(exe, port, dossier),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE, bufsize=0,
+        text=True,
+        encoding="utf-8",
+        shell=platform.system() == "Windows"
+    )
+
+    journal = journal if journal is not None else JournalServeur()
+    journal.vider(p.stderr, "stderr")
+
+    # Arrêter le processus ferme son stdout, ce qui débloque la lecture ci-dessous
+    expiré = threading.Event()
+
+    def expirer():
+        expiré.set()
+        p.kill()
+
+    minuterie = threading.Timer(délai, expirer) if délai is not None else None
+    if minuterie:
+        minuterie.start()
+
+    début = time.monotonic()
+    try:
+        for ligne in iter(p.stdout.readline, ''):
+            journal.ajouter("stdout", ligne)
+            if f_progrès:
+                f_progrès({"durée": time.monotonic() - début, "ligne": ligne.rstrip("\r\n")})
+
+            if prêt := _message_prêt(ligne):
+                journal.vider(p.stdout, "stdout")
+                return p, *prêt
+    finally:
+        if minuterie:
+            minuterie.cancel()
+
+    if expiré.is_set():
+        p.wait()
+        raise TimeoutError(f"Le serveur Constellation n'était pas prêt après {délai} secondes.")
+    raise _erreur_lancement(journal)
+
+
+def lancer_serveur_détaché(
+        préfixe_journal: str,
+        port=None,
+        autoinstaller=True,
+        dossier: Optional[str] = None,
+        exe: TypeExe = EXE_CONSTL,
+        journal: Optional[JournalServeur] = None,
+        délai: Optional[float] = None,
+        f_progrès: Optional[Callable[[Dict[str, Any]], None]] = None
 ) -> Tuple[subprocess.Popen, int, str]:
+    # Comme `lancer_serveur`, mais le serveur est détaché de ce processus-ci (nouvelle session, sans stdin), et écrit
+    # dans les fichiers `{préfixe_journal}.stdout.log` et `{préfixe_journal}.stderr.log` plutôt que dans des tuyaux.
+    # Il peut ainsi survivre au processus qui l'a lancé.
+    if isinstance(exe, str):
+        exe = [exe]
+
+    _assurer_installation(exe, autoinstaller)
+
+    fichier_sortie, fichier_erreurs = f"{préfixe_journal}.stdout.log", f"{préfixe_journal}.stderr.log"
+    os.makedirs(os.path.dirname(os.path.abspath(préfixe_journal)), exist_ok=True)
+    windows = platform.system() == "Windows"
+    if windows:
+        options = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        options = {"start_new_session": True}
+
+    # Le message « prêt » contient le code secret ; les journaux ne sont donc lisibles que par l'utilisateur
+    drapeaux = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    with open(os.open(fichier_sortie, drapeaux, 0o600), "wb") as sortie, \
+            open(os.open(fichier_erreurs, drapeaux, 0o600), "wb") as erreurs:
+        p = subprocess.Popen(
+            _commande_serveur(exe, port, dossier),
+            stdout=sortie, stderr=erreurs, stdin=subprocess.DEVNULL,
+            shell=windows,
+            **options
+        )
+
+    journal = journal if journal is not None else JournalServeur()
+    fil_erreurs = journal.suivre(fichier_erreurs, "stderr", p)
+
+    début = time.monotonic()
+    with open(fichier_sortie, "rb") as d:
+        lecteur = LecteurFichier(d)
+        while True:
+            ligne = lecteur.lire_ligne()
+            if ligne is None:
+                if p.poll() is not None:
+                    break
+                if délai is not None and time.monotonic() - début > délai:
+                    p.kill()
+                    p.wait()
+                    raise TimeoutError(f"Le serveur Constellation n'était pas prêt après {délai} secondes.")
+                time.sleep(.05)
+                continue
+
+            journal.ajouter("stdout", ligne)
+            if f_progrès:
+                f_progrès({"durée": time.monotonic() - début, "ligne": ligne.rstrip("\r\n")})
+
+            if prêt := _message_prêt(ligne):
+                journal.suivre(fichier_sortie, "stdout", p, position=lecteur.position())
+                return p, *prêt
+
+    fil_erreurs.join(1)
+    raise _erreur_lancement(journal)
+
+
+async def lancer_serveur_async(
+        pouponnière: trio.Nursery,
+        port=None,
+        autoinstaller=True,
+        dossier: Optional[str] = None,
+        exe: TypeExe = EXE_CONSTL,
+        journal: Optional[JournalServeur] = None,
+        délai: Optional[float] = None,
+        f_progrès: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> Tuple[trio.Process, int, str]:
+    # Comme `lancer_serveur`, mais sans bloquer la boucle trio. Les flux du serveur sont lus par des tâches de
+    # `pouponnière`, qui se terminent avec le processus.
     if isinstance(exe, str):
         exe = [exe]
 
+    await trio.to_thread.run_sync(_assurer_installation, exe, autoinstaller)
+
+    cmd = _commande_serveur(exe, port, dossier)
+    windows = platform.system() == "Windows"
+    processus = await trio.lowlevel.open_process(
+        subprocess.list2cmdline(cmd) if windows else cmd,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE,
+        shell=windows
+    )
+
+    journal = journal if journal is not None else JournalServeur()
+    sortie = LecteurLignes(processus.stdout)
+    pouponnière.start_soon(_vider_async, LecteurLignes(processus.stderr), "stderr", journal)
+
+    début = trio.current_time()
+    try:
+        with trio.fail_after(délai if délai is not None else math.inf):
+            while (ligne := await sortie.lire_ligne()) is not None:
+                journal.ajouter("stdout", ligne)
+                if f_progrès:
+                    progrès = {"durée": trio.current_time() - début, "ligne": ligne.rstrip("\r\n")}
+                    if inspect.iscoroutinefunction(f_progrès):
+                        await f_progrès(progrès)
+                    else:
+                        f_progrès(progrès)
+
+                if prêt := _message_prêt(ligne):
+                    pouponnière.start_soon(_vider_async, sortie, "stdout", journal)
+                    return processus, *prêt
+    except BaseException as é:
+        with trio.CancelScope(shield=True):
+            processus.kill()
+            await processus.wait()
+        if isinstance(é, trio.TooSlowError):
+            raise TimeoutError(f"Le serveur Constellation n'était pas prêt après {délai} secondes.") from é
+        raise
+
+    with trio.CancelScope(shield=True):
+        await processus.wait()
+    raise _erreur_lancement(journal)
+
+
+class LecteurLignes(object):
+    # Lit un flux trio ligne par ligne
+    def __init__(soimême, flux: trio.abc.ReceiveStream):
+        soimême.flux = flux
+        soimême._tampon = bytearray()
+
+    async def lire_ligne(soimême) -> Optional[str]:
+        while (i := soimême._tampon.find(b"\n")) < 0:
+            données = await soimême.flux.receive_some()
+            if not données:
+                if not soimême._tampon:
+                    return None
+                i = len(soimême._tampon) - 1
+                break
+            soimême._tampon += données
+        ligne = bytes(soimême._tampon[:i + 1])
+        del soimême._tampon[:i + 1]
+        return ligne.decode("utf-8", errors="replace")
+
+
+async def _vider_async(lecteur: LecteurLignes, flux: str, journal: JournalServeur):
+    try:
+        while (ligne := await lecteur.lire_ligne()) is not None:
+            journal.ajouter(flux, ligne)
+    except (trio.ClosedResourceError, trio.BrokenResourceError):
+        pass
+
+
+def _assurer_installation(exe: List[str], autoinstaller: bool):
     if autoinstaller:
         try:
             vérifier_installation_constellation(exe)
@@ -35,34 +383,35 @@ def lancer_serveur(
 
     vérifier_installation_constellation(exe)
 
+
+def _commande_serveur(exe: List[str], port: Optional[int], dossier: Optional[str]) -> List[str]:
     cmd = [*exe, "lancer", "-m"]
     if port:
         cmd += ["-p", str(port)]
     if dossier:
         cmd += [f"--dossier={dossier}"]
+    return cmd
 
-    p = subprocess.Popen(
-        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE, bufsize=0,
-        text=True,
-        encoding="utf-8",
-        shell=platform.system() == "Windows"
-    )
 
-    for ligne in iter(p.stdout.readline, ''):
-        logging.debug("Message du serveur : " + ligne)
+def _message_prêt(ligne: str) -> Optional[Tuple[int, str]]:
+    if "MESSAGE MACHINE" in ligne:
+        message = json.loads(ligne.split(":", 1)[1])
+        if message["type"] == "NŒUD PRÊT":
+            return message["port"], message["codeSecret"]
 
-        if "MESSAGE MACHINE" in ligne:
-            message = json.loads(ligne.split(":", 1)[1])
-            if message["type"] == "NŒUD PRÊT":
-                port = message["port"]
-                code_secret = message["codeSecret"]
-                return p, port, code_secret
 
-    raise ConnectionError("Le serveur n'a pas répondu.")
+def _erreur_lancement(journal: JournalServeur) -> ConnectionError:
+    erreurs = journal.obtenir("stderr")[-20:]
+    return ConnectionError("Le serveur n'a pas répondu." + ("\n" + "\n".join(erreurs) if erreurs else ""))
 
 
 type_contexte = TypedDict("type_contexte", {"port_serveur": Optional[int], "code_secret": Optional[str]})
-context: type_contexte = {"port_serveur": None, "code_secret": None}
+
+# Le serveur en contexte (`with Serveur():`). Chaque fil d'exécution et chaque tâche trio a le sien ; on peut donc avoir
+# plusieurs serveurs en même temps, tant qu'ils ne sont pas imbriqués dans le même contexte.
+_contexte: contextvars.ContextVar[type_contexte] = contextvars.ContextVar(
+    "contexte_serveur_constellation", default={"port_serveur": None, "code_secret": None}
+)
 
 
 class ErreurConnexionContexteExistant(ConnectionError):
@@ -70,21 +419,25 @@ class ErreurConnexionContexteExistant(ConnectionError):
         super().__init__("On ne peut avoir qu'un seule serveur en contexte à la fois.")
 
 
-def changer_contexte(port: int, code_secret: str):
-    if context["port_serveur"] is not None:
+def changer_contexte(port: int, code_secret: str) -> contextvars.Token:
+    if obtenir_port_contexte() is not None:
         raise ErreurConnexionContexteExistant()
 
-    context["port_serveur"] = port
-    context["code_secret"] = code_secret
+    return _contexte.set({"port_serveur": port, "code_secret": code_secret})
 
 
-def effacer_contexte():
-    context["port_serveur"] = None
-    context["code_secret"] = None
+def effacer_contexte(jeton: Optional[contextvars.Token] = None):
+    if jeton is not None:
+        try:
+            _contexte.reset(jeton)
+            return
+        except ValueError:
+            pass  # Jeton créé dans un autre contexte
+    _contexte.set({"port_serveur": None, "code_secret": None})
 
 
 def obtenir_contexte() -> type_contexte:
-    return context
+    return dict(_contexte.get())
 
 
 def obtenir_port_contexte() -> Optional[str]:
@@ -114,7 +467,16 @@ def mettre_serveur_à_jour(exe: TypeExe = EXE_CONSTL):
 
 
 def obt_version_serveur(exe: TypeExe = EXE_CONSTL) -> Optional[Version]:
+    exe = [exe] if isinstance(exe, str) else list(exe)
+    clef = "version:" + json.dumps(exe)
+    empreinte = [list(x) for x in _empreinte_exe(exe)]
+
+    entrée = cache_installation.obtenir(clef, DURÉE_CACHE_VERSION_SERVEUR)
+    if entrée and entrée["empreinte"] == empreinte:
+        return Version(entrée["version"])
+
     if v := _obt_version(exe, "version"):
+        cache_installation.changer(clef, {"empreinte": empreinte, "version": v})
         return Version(v)
 
 
@@ -133,9 +495,30 @@ def obt_version_serveur_plus_récente_compatible() -> Version:
 
 
 def obt_versions_dispo_npm(paquet: str) -> List[Version]:
+    clef = "npm:" + paquet
+    entrée = cache_installation.obtenir(clef, math.inf)
+    if entrée and time.time() - entrée["horodatage"] < DURÉE_CACHE_VERSIONS_NPM:
+        return [Version(v) for v in entrée["versions"]]
+
+    # Requête conditionnelle, et document abrégé du registre, beaucoup plus léger que le document complet
+    entêtes = {"Accept": "application/vnd.npm.install-v1+json"}
+    if entrée and entrée.get("etag"):
+        entêtes["If-None-Match"] = entrée["etag"]
+    if entrée and entrée.get("modifié"):
+        entêtes["If-Modified-Since"] = entrée["modifié"]
+
     http = urllib3.PoolManager()
-    r = http.request("GET", f"https://registry.npmjs.org/{paquet}")
-    return [Version(v) for v in json.loads(r.data.decode())["versions"].keys()]
+    r = http.request("GET", f"https://registry.npmjs.org/{paquet}", headers=entêtes)
+    if r.status == 304 and entrée:
+        versions = entrée["versions"]
+    else:
+        versions = list(json.loads(r.data.decode())["versions"].keys())
+    cache_installation.changer(clef, {
+        "versions": versions,
+        "etag": r.headers.get("ETag", entrée and entrée.get("etag")),
+        "modifié": r.headers.get("Last-Modified", entrée and entrée.get("modifié"))
+    })
+    return [Version(v) for v in versions]
 
 
 def _obt_version(commande: TypeExe, arg="-v") -> Optional[str]:
@@ -163,6 +546,7 @@ def _obt_version(commande: TypeExe, arg="-v") -> Optional[str]:
 
 def installer_serveur(version: Version):
     assurer_npm_pnpm_installés()
+    cache_installation.effacer()
 
     code_installation = subprocess.Popen(
         ["curl", "https://raw.githubusercontent.com/reseau-constellation/serveur-ws/principale/installer.cjs"],
@@ -191,6 +575,7 @@ def désinstaller_constellation():
 
 def désinstaller_serveur():
     désinstaller_de_pnpm(PAQUET_SERVEUR)
+    cache_installation.effacer()
 
 
 @lru_cache
@@ -289,35 +674,286 @@ def obt_version_npm() -> Optional[str]:
     return _obt_version("npm", "-v")
 
 
+class VerrouFichier(object):
+    # Verrou exclusif entre processus, tenu sur un fichier
+    def __init__(soimême, fichier: str):
+        soimême.fichier = fichier
+        soimême._d: Optional[IO[str]] = None
+
+    def __enter__(soimême) -> "VerrouFichier":
+        os.makedirs(os.path.dirname(os.path.abspath(soimême.fichier)), exist_ok=True)
+        soimême._d = open(soimême.fichier, "a+")
+        if platform.system() == "Windows":
+            import msvcrt
+            soimême._d.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(soimême._d.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # `LK_LOCK` abandonne après 10 secondes ; on réessaie
+        else:
+            import fcntl
+            fcntl.flock(soimême._d, fcntl.LOCK_EX)
+        return soimême
+
+    def __exit__(soimême, *args):
+        if platform.system() == "Windows":
+            import msvcrt
+            soimême._d.seek(0)
+            msvcrt.locking(soimême._d.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(soimême._d, fcntl.LOCK_UN)
+        soimême._d.close()
+        soimême._d = None
+
+
+class DécouverteServeur(object):
+    # Fichier de découverte d'un nœud Constellation partagé entre plusieurs processus : port, code secret, PID et
+    # version du nœud, ainsi que les PID des processus qui l'utilisent (un par `Serveur`, ce qui tient lieu de compte
+    # de références). Toute lecture ou modification doit se faire sous `verrou()`.
+    def __init__(soimême, fichier: str):
+        soimême.fichier = fichier
+
+    def verrou(soimême) -> VerrouFichier:
+        return VerrouFichier(soimême.fichier + ".verrou")
+
+    def lire(soimême) -> Optional[Dict[str, Any]]:
+        # Le nœud publié, s'il est toujours en santé. Les utilisateurs disparus sans se désinscrire sont oubliés.
+        nœud = _lire_json(soimême.fichier)
+        if not nœud:
+            return
+        if not _nœud_en_santé(nœud["pid"], nœud["port"]):
+            soimême.effacer()
+            return
+        nœud["utilisateurs"] = [pid for pid in nœud["utilisateurs"] if _processus_vivant(pid)]
+        return nœud
+
+    def publier(soimême, port: int, code_secret: str, pid: int, version: Optional[str]) -> None:
+        _écrire_json(soimême.fichier, {
+            "port": port, "code_secret": code_secret, "pid": pid, "version": version,
+            "utilisateurs": [os.getpid()]
+        })
+
+    def rejoindre(soimême, nœud: Dict[str, Any]) -> None:
+        _écrire_json(soimême.fichier, {**nœud, "utilisateurs": nœud["utilisateurs"] + [os.getpid()]})
+
+    def quitter(soimême, pid_nœud: int) -> bool:
+        # Retire une référence du processus actuel, et indique s'il s'agissait de la dernière (auquel cas le nœud doit
+        # être arrêté)
+        nœud = _lire_json(soimême.fichier)
+        if not nœud or nœud["pid"] != pid_nœud:
+            return True  # Le nœud n'est plus publié ; personne d'autre ne peut le trouver
+        utilisateurs = [pid for pid in nœud["utilisateurs"] if _processus_vivant(pid)]
+        if os.getpid() in utilisateurs:
+            utilisateurs.remove(os.getpid())
+        if utilisateurs:
+            _écrire_json(soimême.fichier, {**nœud, "utilisateurs": utilisateurs})
+            return False
+        soimême.effacer()
+        return True
+
+    def effacer(soimême) -> None:
+        try:
+            os.remove(soimême.fichier)
+        except FileNotFoundError:
+            pass
+
+
+def _fichier_découverte(dossier: Optional[str], exe: TypeExe) -> str:
+    # Un nœud partagé par dossier de données et exécutable
+    exe = [exe] if isinstance(exe, str) else list(exe)
+    empreinte = blake2b(
+        json.dumps([os.path.abspath(dossier) if dossier else None, exe]).encode(), digest_size=8
+    ).hexdigest()
+    return os.path.join(appdirs.user_cache_dir("constellationPy"), f"serveur-{empreinte}.json")
+
+
+def _processus_vivant(pid: int) -> bool:
+    if platform.system() == "Windows":
+        import ctypes
+        poignée = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not poignée:
+            return False
+        ctypes.windll.kernel32.CloseHandle(poignée)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Le processus existe, mais appartient à un autre utilisateur
+    return True
+
+
+def _nœud_en_santé(pid: int, port: int) -> bool:
+    if not _processus_vivant(pid):
+        return False
+    try:
+        with socket.create_connection(("localhost", port), timeout=1):
+            return True
+    except OSError:
+        return False
+
+
 class Serveur(object):
     def __init__(
             soimême,
             port: Optional[int] = None,
             autoinstaller=True,
             dossier: Optional[str] = None,
-            exe: TypeExe = EXE_CONSTL
+            exe: TypeExe = EXE_CONSTL,
+            taille_journal: int = TAILLE_JOURNAL_SERVEUR,
+            niveau_journal: Optional[int] = logging.DEBUG,
+            délai: Optional[float] = None,
+            f_progrès: Optional[Callable[[Dict[str, Any]], Any]] = None,
+            partager: bool = False,
+            fichier_découverte: Optional[str] = None
     ):
+        # Avec `partager=True`, un nœud déjà lancé (par un autre processus, p. ex.) pour le même dossier et le même
+        # exécutable est réutilisé plutôt que d'en lancer un nouveau. Le dernier utilisateur à quitter l'arrête.
         soimême.port = port
         soimême.autoinstaller = autoinstaller
         soimême.exe = exe
+        soimême.délai = délai
+        soimême.f_progrès = f_progrès
+        soimême.journal = JournalServeur(taille_journal, niveau_journal)
 
         soimême.dossier = dossier
 
-        soimême.serveur: Optional[subprocess.Popen] = None
+        soimême.partager = partager
+        soimême.découverte = DécouverteServeur(
+            fichier_découverte or _fichier_découverte(dossier, exe)
+        ) if partager else None
+
+        # `serveur` reste `None` si on s'est joint à un nœud partagé lancé par un autre processus
+        soimême.serveur: Optional[Union[subprocess.Popen, trio.Process]] = None
+        soimême.pid: Optional[int] = None
+        soimême.code_secret: Optional[str] = None
+        soimême._jeton_contexte: Optional[contextvars.Token] = None
 
     def __enter__(soimême):
         if obtenir_port_contexte():
             raise ErreurConnexionContexteExistant()
-        soimême.serveur, soimême.port, soimême.code_secret = lancer_serveur(
+        if soimême.partager:
+            soimême._entrer_partagé()
+        else:
+            soimême._lancer()
+        soimême._jeton_contexte = changer_contexte(soimême.port, soimême.code_secret)
+        return soimême
+
+    def __exit__(soimême, *args):
+        effacer_contexte(soimême._jeton_contexte)
+        soimême._quitter()
+
+    def _quitter(soimême):
+        if soimême.partager:
+            soimême._sortir_partagé()
+        else:
+            soimême._arrêter()
+
+    def _lancer(soimême, préfixe_journal: Optional[str] = None):
+        # Avec `préfixe_journal`, le serveur est lancé détaché de ce processus (voir `lancer_serveur_détaché`)
+        lancer = partial(lancer_serveur_détaché, préfixe_journal) if préfixe_journal else lancer_serveur
+        soimême.serveur, soimême.port, soimême.code_secret = lancer(
             port=soimême.port,
             autoinstaller=soimême.autoinstaller,
             dossier=soimême.dossier,
-            exe=soimême.exe
+            exe=soimême.exe,
+            journal=soimême.journal,
+            délai=soimême.délai,
+            f_progrès=soimême.f_progrès
         )
-        changer_contexte(soimême.port, soimême.code_secret)
-        return soimême
+        soimême.pid = soimême.serveur.pid
 
-    def __exit__(soimême, *args):
-        effacer_contexte()
-        soimême.serveur.stdin.write("\n")
-        soimême.serveur.terminate()
+    def _arrêter(soimême):
+        if soimême.serveur is not None:
+            if soimême.serveur.stdin:
+                soimême.serveur.stdin.write("\n")
+            soimême.serveur.terminate()
+        else:
+            try:
+                os.kill(soimême.pid, signal.SIGTERM)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def _entrer_partagé(soimême):
+        version = obt_version_serveur(soimême.exe)
+        with soimême.découverte.verrou():
+            nœud = soimême.découverte.lire()
+            if nœud and nœud["version"] == (str(version) if version else None) \
+                    and soimême.port in [None, nœud["port"]]:
+                soimême.découverte.rejoindre(nœud)
+                soimême.port, soimême.code_secret, soimême.pid = nœud["port"], nœud["code_secret"], nœud["pid"]
+                return
+
+            if nœud:
+                # Un autre nœud, incompatible, est déjà publié ; on garde le nôtre pour nous
+                logging.warning(
+                    f"Le nœud Constellation partagé (port {nœud['port']}, version {nœud['version']}) ne correspond "
+                    f"pas ; lancement d'un nœud privé."
+                )
+                soimême.partager = False
+                soimême._lancer()
+            else:
+                # Le nœud partagé doit survivre au départ de ce processus-ci s'il a toujours d'autres utilisateurs
+                soimême._lancer(préfixe_journal=os.path.splitext(soimême.découverte.fichier)[0])
+                soimême.découverte.publier(
+                    soimême.port, soimême.code_secret, soimême.pid, str(version) if version else None
+                )
+
+    def _sortir_partagé(soimême):
+        with soimême.découverte.verrou():
+            dernier = soimême.découverte.quitter(soimême.pid)
+        if dernier:
+            soimême._arrêter()
+        elif soimême.serveur is not None:
+            # On laisse tourner le nœud (détaché) pour les autres utilisateurs
+            logging.info(f"Le nœud Constellation partagé (port {soimême.port}) reste ouvert pour d'autres processus.")
+
+
+@asynccontextmanager
+async def ouvrir_serveur(**argsmc) -> AsyncIterator[Serveur]:
+    # Version asynchrone de `with Serveur(...)`, qui accepte les mêmes arguments : `async with ouvrir_serveur() as serveur:`
+    serveur = Serveur(**argsmc)
+    if obtenir_port_contexte():
+        raise ErreurConnexionContexteExistant()
+
+    if serveur.partager:
+        # Le nœud partagé peut survivre à ce gestionnaire de contexte ; on le lance donc hors de toute pouponnière
+        await trio.to_thread.run_sync(serveur._entrer_partagé)
+        serveur._jeton_contexte = changer_contexte(serveur.port, serveur.code_secret)
+        try:
+            yield serveur
+        finally:
+            effacer_contexte(serveur._jeton_contexte)
+            with trio.CancelScope(shield=True):
+                await trio.to_thread.run_sync(serveur._quitter)
+        return
+
+    async with trio.open_nursery() as pouponnière:
+        processus, serveur.port, serveur.code_secret = await lancer_serveur_async(
+            pouponnière,
+            port=serveur.port,
+            autoinstaller=serveur.autoinstaller,
+            dossier=serveur.dossier,
+            exe=serveur.exe,
+            journal=serveur.journal,
+            délai=serveur.délai,
+            f_progrès=serveur.f_progrès
+        )
+        serveur.serveur = processus
+        serveur.pid = processus.pid
+        serveur._jeton_contexte = changer_contexte(serveur.port, serveur.code_secret)
+        try:
+            yield serveur
+        finally:
+            effacer_contexte(serveur._jeton_contexte)
+            with trio.CancelScope(shield=True):
+                try:
+                    await processus.stdin.send_all(b"\n")
+                except (trio.BrokenResourceError, trio.ClosedResourceError):
+                    pass
+                processus.terminate()
+                await processus.wait()
@@ -1,36 +1,228 @@
-from typing import Optional, List
+from __future__ import annotations
+
+import contextvars
+import threading
+from typing import Optional, List, Any, Callable, Awaitable, Iterable, Iterator, Union, Dict, Tuple
 
 import trio
 
-from .client import ouvrir_client
+from .client import ouvrir_client, Client
 from .utils import à_kebab, une_fois
 
 
 class ClientSync(object):
-    def __init__(soimême, port: Optional[int] = None, _liste_attributs: Optional[List[str]] = None):
+    def __init__(
+            soimême,
+            port: Optional[int] = None,
+            code_secret: Optional[str] = None,
+            _liste_attributs: Optional[List[str]] = None,
+            _client_original: Optional[ClientSync] = None,
+            **options
+    ):
         soimême.port = port
+        soimême.code_secret = code_secret
+        soimême.options = options  # Options passées à `Client` (p. ex., `reconnecter=True` ou `serveur=serveur`)
         soimême._liste_attributs = _liste_attributs or []
+        soimême._client_original = _client_original or soimême
+
+        # Pour le mode persistant (`with ClientSync() as client:`)
+        soimême._fil: Optional[threading.Thread] = None
+        soimême._jeton_trio: Optional[trio.lowlevel.TrioToken] = None
+        soimême._client: Optional[Client] = None
+        soimême._fermer: Optional[trio.Event] = None
+        soimême._erreur_fil: Optional[BaseException] = None
+        soimême._verrou = threading.Lock()
+
+    @property
+    def ouvert(soimême) -> bool:
+        return soimême._client_original._client is not None
+
+    def ouvrir(soimême) -> ClientSync:
+        # Lance une boucle trio sur un fil d'exécution dédié, qui gardera un seul `Client` (et donc une seule connexion
+        # websocket) ouvert jusqu'à ce qu'on appelle `fermer()`.
+        original = soimême._client_original
+        with original._verrou:
+            if original._fil is not None:
+                return original
+
+            prêt = threading.Event()
+            original._erreur_fil = None
+
+            async def f_fil():
+                async with ouvrir_client(original.port, original.code_secret, **original.options) as client:
+                    original._fermer = trio.Event()
+                    original._jeton_trio = trio.lowlevel.current_trio_token()
+                    original._client = client
+                    prêt.set()
+
+                    await original._fermer.wait()
+
+            def lancer_fil():
+                try:
+                    trio.run(f_fil)
+                except BaseException as é:
+                    original._erreur_fil = é
+                finally:
+                    original._client = None
+                    original._jeton_trio = None
+                    original._fil = None
+                    prêt.set()
+
+            # Le fil dédié voit le même serveur en contexte (`with Serveur():`) que le fil qui ouvre le client
+            original._fil = threading.Thread(
+                target=contextvars.copy_context().run, args=(lancer_fil,), name="ClientSync Constellation", daemon=True
+            )
+            original._fil.start()
+            prêt.wait()
+
+            soimême._soulever_erreur_fil()
+
+        return original
+
+    def fermer(soimême) -> None:
+        original = soimême._client_original
+        with original._verrou:
+            fil = original._fil
+            if fil is not None:
+                if original._jeton_trio is not None:
+                    try:
+                        trio.from_thread.run_sync(original._fermer.set, trio_token=original._jeton_trio)
+                    except trio.RunFinishedError:
+                        pass  # La boucle s'est déjà arrêtée entre-temps
+                fil.join()
+
+        soimême._soulever_erreur_fil()
+
+    def _soulever_erreur_fil(soimême) -> None:
+        # Une erreur survenue sur le fil dédié n'est pas perdue ; on la soulève au prochain appel
+        original = soimême._client_original
+        erreur, original._erreur_fil = original._erreur_fil, None
+        if erreur is not None:
+            raise erreur
+
+    def __enter__(soimême) -> ClientSync:
+        return soimême.ouvrir()
+
+    def __exit__(soimême, *args):
+        soimême.fermer()
 
     def __getattr__(soimême, item):
-        return ClientSync(soimême.port, soimême._liste_attributs + [à_kebab(item)])
+        enfant = ClientSync(
+            soimême.port, soimême.code_secret, soimême._liste_attributs + [à_kebab(item)],
+            _client_original=soimême._client_original
+        )
+        # Gardé comme attribut ordinaire, afin que les prochains accès ne repassent plus par `__getattr__`
+        object.__setattr__(soimême, item, enfant)
+        return enfant
+
+    def _exécuter(soimême, f: Callable[[Client], Awaitable[Any]]) -> Any:
+        original = soimême._client_original
+
+        soimême._soulever_erreur_fil()
+
+        # En mode persistant, on passe par la boucle trio du fil dédié
+        client, jeton = original._client, original._jeton_trio
+        if client is not None:
+            async def f_persistante():
+                # Une pouponnière, comme dans `ouvrir_client`, afin que les erreurs soient soulevées sous la même
+                # forme (`ExceptionGroup`) qu'en mode non persistant.
+                async with trio.open_nursery():
+                    return await f(client)
+
+            return trio.from_thread.run(f_persistante, trio_token=jeton)
+
+        # Sinon, on ouvre (et on ferme) une nouvelle connexion pour chaque appel
+        async def f_async():
+            async with ouvrir_client(original.port, original.code_secret, **original.options) as client_:
+                return await f(client_)
+
+        return trio.run(f_async)
+
+    def _naviguer(soimême, client: Client) -> Client:
+        f_client = client
+        for x in soimême._liste_attributs:
+            f_client = getattr(f_client, x)
+        return f_client
+
+    def en_lot(
+            soimême,
+            appels: Iterable[Union[Dict[str, Any], Tuple[Union[str, List[str]], Dict[str, Any]]]],
+            fenêtre: int = 100
+    ) -> List[Any]:
+        async def f_async(client: Client):
+            return await soimême._naviguer(client).en_lot(appels, fenêtre=fenêtre)
+
+        return soimême._exécuter(f_async)
+
+    def ajouter_données_tableau(soimême, id_tableau: str, données, **argsmc) -> List[str]:
+        # Méthode explicite, car `f_progrès` serait autrement pris pour une fonction de suivi
+        async def f_async(client: Client):
+            return await client.ajouter_données_tableau(id_tableau, données, **argsmc)
+
+        return soimême._exécuter(f_async)
+
+    def itérer(
+            soimême,
+            politique: str = "dernière",
+            taille: int = 1,
+            nom_arg_fonction: str = "f",
+            **argsmc
+    ) -> Iterator[Any]:
+        # Générateur synchrone sur les valeurs d'un suivi (`for valeur in client.fonction_suivi.itérer(): ...`), avec
+        # les mêmes politiques que `Client.itérer`. Le suivi est oublié lorsque le générateur est fermé (p. ex., avec
+        # `break`). Si le client n'est pas déjà ouvert en mode persistant, une connexion est ouverte pour la durée de
+        # l'itération.
+        original = soimême._client_original
+        temporaire = not original.ouvert
+        if temporaire:
+            original.ouvrir()
+
+        gestionnaire = None
+
+        async def entrer(client: Client):
+            nonlocal gestionnaire
+            gestionnaire = soimême._naviguer(client).itérer(
+                politique=politique, taille=taille, nom_arg_fonction=nom_arg_fonction, **argsmc
+            )
+            return await gestionnaire.__aenter__()
+
+        async def recevoir(_: Client):
+            try:
+                return True, await valeurs.receive()
+            except trio.EndOfChannel:
+                return False, None
+
+        async def sortir(_: Client):
+            await gestionnaire.__aexit__(None, None, None)
+
+        try:
+            valeurs = soimême._exécuter(entrer)
+            try:
+                while True:
+                    reçue, valeur = soimême._exécuter(recevoir)
+                    if not reçue:
+                        return
+                    yield valeur
+            finally:
+                soimême._exécuter(sortir)
+        finally:
+            if temporaire:
+                original.fermer()
 
     def __call__(soimême, **argsmc):
         nom_arg_fonction = next((c for c, v in argsmc.items() if callable(v)), None)
         argsmc = {c: v for c, v in argsmc.items()}  # Ne pas convertir à chameau ici ; le client asynchrone s'en occupe
 
-        async def f_async():
-            async with ouvrir_client(soimême.port) as client:
-                f_client = client
-                for x in soimême._liste_attributs:
-                    f_client = getattr(f_client, x)
+        async def f_async(client: Client):
+            f_client = soimême._naviguer(client)
 
-                if nom_arg_fonction:
-                    async def f_pour_une_fois(f):
-                        argsmc[nom_arg_fonction] = f
-                        return await f_client(**argsmc)
+            if nom_arg_fonction:
+                async def f_pour_une_fois(f):
+                    argsmc[nom_arg_fonction] = f
+                    return await f_client(**argsmc)
 
-                    return await une_fois(f_pour_une_fois, client.pouponnière)
+                return await une_fois(f_pour_une_fois, client.pouponnière)
 
-                return await f_client(**argsmc)
+            return await f_client(**argsmc)
 
-        return trio.run(f_async)
+        return soimême._exécuter(f_async)
@@ -1,18 +1,62 @@
 from __future__ import annotations
 
+import functools
+import hashlib
 import inspect
 import json
 import logging
-from typing import Any, TypedDict, Callable, Coroutine, Awaitable, Optional
+from typing import Any, TypedDict, Callable, Coroutine, Awaitable, Optional, Iterator
 from typing import TYPE_CHECKING
 
 import pandas as pd
 import trio
 
+from .const import TAILLE_MORCEAU_PANDAS, TAILLE_MORCEAU_EMPREINTE
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 if TYPE_CHECKING:
     pass
 
+# On utilise orjson, beaucoup plus rapide, s'il est installé (`pip install constellationPy[rapide]`)
+moteur_json = "orjson" if orjson else "json"
+
+
+def choisir_moteur_json(nom: str) -> None:
+    global moteur_json
+    if nom not in ["json", "orjson"]:
+        raise ValueError(f"Moteur JSON inconnu : {nom}")
+    if nom == "orjson" and orjson is None:
+        raise ModuleNotFoundError("Le moteur « orjson » n'est pas installé. Faites `pip install orjson`.")
+    moteur_json = nom
+
+
+def _défaut_json(val: Any) -> Any:
+    if isinstance(val, (set, frozenset)):
+        return list(val)
+    raise TypeError(f"Objet de type {type(val).__name__} non sérialisable en JSON")
+
+
+def sérialiser(val: Any, trier: bool = False) -> str:
+    # `trier=True` donne une forme canonique (clefs triées), p. ex. pour comparer des arguments
+    if moteur_json == "orjson":
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if trier:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(val, default=_défaut_json, option=option).decode()
+    return json.dumps(val, ensure_ascii=False, default=_défaut_json, sort_keys=trier)
+
 
+def désérialiser(texte: str | bytes) -> Any:
+    if moteur_json == "orjson":
+        return orjson.loads(texte)
+    return json.loads(texte)
+
+
+@functools.lru_cache(maxsize=1024)
 def à_chameau(text: str) -> str:
     # https://stackoverflow.com/questions/60978672/python-string-to-camelcase
     s = text.replace("-", " ").replace("_", " ")
@@ -22,11 +66,13 @@ def à_chameau(text: str) -> str:
     return s[0] + ''.join(i.capitalize() for i in s[1:])
 
 
+@functools.lru_cache(maxsize=1024)
 def à_kebab(text: str) -> str:
     return ''.join(['_' + x.lower() if x.isupper() else x for x in text]).lstrip('_')
 
 
-def fais_rien() -> None:
+def fais_rien(*_args, **_argsmc) -> None:
+    # Accepte (et ignore) tout argument, afin de pouvoir servir de fonction de suivi
     pass
 
 
@@ -81,18 +127,74 @@ async def une_fois(
 
     return await une_fois_sans_oublier(f_async, pouponnière, fCond)
 
-def attendre_stabilité(n: int | float) -> Callable[[Any], Awaitable[bool]]:
+def empreinte_valeur(val: Any) -> bytes:
+    # Une empreinte courte d'une valeur, pour détecter les changements sans garder la valeur (potentiellement énorme)
+    # en mémoire. Les listes et dictionnaires sont hachés élément par élément, sans jamais sérialiser la valeur entière
+    # (p. ex., un tableau exporté) d'un coup.
+    h = hashlib.blake2b(digest_size=16)
+    _hacher_valeur(h, val)
+    return h.digest()
+
+
+def _hacher_valeur(h: "hashlib._Hash", val: Any) -> None:
+    if isinstance(val, list) and val and all(isinstance(x, dict) and "empreinte" in x for x in val):
+        # Pour une liste d'éléments de tableau Constellation, les empreintes des éléments suffisent
+        h.update(b"E")
+        for x in val:
+            h.update(x["empreinte"].encode())
+            h.update(b"\0")
+    elif isinstance(val, list):
+        # Par morceaux de rangées : la mémoire reste limitée, sans payer le coût d'une sérialisation par rangée
+        h.update(b"[")
+        for i in range(0, len(val), TAILLE_MORCEAU_EMPREINTE):
+            h.update(sérialiser(val[i:i + TAILLE_MORCEAU_EMPREINTE]).encode())
+            h.update(b"\0")
+        h.update(b"]")
+    elif isinstance(val, dict):
+        h.update(b"{")
+        for c in sorted(val):
+            h.update(sérialiser(c).encode())
+            h.update(b":")
+            _hacher_valeur(h, val[c])
+        h.update(b"}")
+    else:
+        h.update(sérialiser(val).encode())
+
+
+def attendre_stabilité(
+        n: int | float,
+        n_min: Optional[int | float] = None,
+        délai_max: Optional[int | float] = None
+) -> Callable[[Any], Awaitable[bool]]:
+    # Une valeur est considérée stable si aucune nouvelle valeur n'est reçue dans les `n` secondes qui suivent.
+    # Si `n_min` est spécifié, l'attente s'adapte plutôt au rythme des mises à jour : deux fois l'intervalle entre les
+    # deux dernières valeurs, entre `n_min` et `n`. Si `délai_max` est spécifié, la valeur la plus récente est acceptée
+    # au plus tard `délai_max` secondes après la réception de la première valeur.
+
+    précédente = {"empreinte": None, "début": None, "dernière": None, "intervalle": None}
 
-    précédente = {}
     async def stable(val: Any):
-        chaîne_val = json.dumps(val, ensure_ascii=False)
+        maintenant = trio.current_time()
+        empreinte = empreinte_valeur(val)
+
+        if précédente["début"] is None:
+            précédente["début"] = maintenant
+        if précédente["dernière"] is not None:
+            précédente["intervalle"] = maintenant - précédente["dernière"]
+        précédente["dernière"] = maintenant
 
-        if "val" in précédente and chaîne_val == précédente["val"]:
+        if empreinte == précédente["empreinte"]:
             return False
+        précédente["empreinte"] = empreinte
 
-        précédente["val"] = chaîne_val
-        await trio.sleep(n)
-        return précédente["val"] == chaîne_val
+        attente = n
+        if n_min is not None and précédente["intervalle"] is not None:
+            attente = min(n, max(n_min, 2 * précédente["intervalle"]))
+        if délai_max is not None:
+            attente = max(0, min(attente, précédente["début"] + délai_max - maintenant))
+
+        await trio.sleep(attente)
+        return précédente["empreinte"] == empreinte
 
     return stable
 
@@ -102,11 +204,26 @@ type_tableau_exporté = TypedDict("type_tableau_exporté",
                                  {"données": list[dict[str, Any]], "fichiersSFIP": set, "nomTableau": str})
 
 
-def tableau_exporté_à_pandas(tableau: type_tableau_exporté):
+def tableau_exporté_à_pandas(
+        tableau: type_tableau_exporté,
+        taille_morceau: Optional[int] = None,
+        consommer: bool = False
+) -> pd.DataFrame:
     données = tableau["données"]
 
-    données_pandas = pd.DataFrame(données)
-    return données_pandas
+    if not consommer or not taille_morceau or len(données) <= taille_morceau:
+        return pd.DataFrame(données)
+
+    # On construit le tableau Pandas morceau par morceau en vidant la liste de dictionnaires au fur et à mesure, afin
+    # de ne jamais garder en mémoire l'ensemble des données en format Python et en format Pandas à la fois.
+    # On part de la fin de la liste, où enlever des éléments ne coûte rien.
+    morceaux = []
+    while données:
+        morceaux.append(pd.DataFrame(données[-taille_morceau:]))
+        del données[-taille_morceau:]
+    morceaux.reverse()
+
+    return pd.concat(morceaux, ignore_index=True)
 
 
 def tableau_à_pandas(tableau: type_tableau, index_empreinte=False) -> pd.DataFrame:
@@ -117,10 +234,88 @@ def tableau_à_pandas(tableau: type_tableau, index_empreinte=False) -> pd.DataFr
     return données_pandas
 
 
+type_changements = TypedDict(
+    "type_changements", {"ajoutés": pd.DataFrame, "modifiés": pd.DataFrame, "effacés": list[str]}
+)
+
+
+class TableauVivant(object):
+    # Un tableau Pandas tenu à jour à partir d'un suivi (`client.tableaux.suivre_données(..., f=tableau.mettre_à_jour)`).
+    # Plutôt que de reconstruire le tableau à chaque mise à jour, on compare les éléments reçus à ceux déjà présents
+    # selon leur empreinte et on n'applique que les différences. L'index du tableau est l'empreinte des éléments.
+    def __init__(soimême, f_changements: Optional[Callable[[type_changements], None]] = None):
+        soimême.f_changements = f_changements
+        soimême.données = pd.DataFrame()
+        soimême.changements: Optional[type_changements] = None
+        soimême._éléments: dict[str, dict[str, Any]] = {}
+
+    def mettre_à_jour(soimême, éléments: type_tableau) -> None:
+        nouveaux = {x["empreinte"]: x["données"] for x in éléments}
+        anciens = soimême._éléments
+
+        effacés = [e for e in anciens if e not in nouveaux]
+        ajoutés = {e: d for e, d in nouveaux.items() if e not in anciens}
+        modifiés = {e: d for e, d in nouveaux.items() if e in anciens and anciens[e] != d}
+
+        changements: type_changements = {
+            "ajoutés": pd.DataFrame.from_dict(ajoutés, orient="index"),
+            "modifiés": pd.DataFrame.from_dict(modifiés, orient="index"),
+            "effacés": effacés
+        }
+
+        données = soimême.données
+        à_enlever = effacés + list(modifiés)
+        if à_enlever:
+            données = données.drop(index=à_enlever)
+        à_ajouter = [df for df in [changements["modifiés"], changements["ajoutés"]] if len(df)]
+        if à_ajouter:
+            données = pd.concat([données, *à_ajouter]) if len(données) else pd.concat(à_ajouter)
+
+        soimême.données = données
+        soimême._éléments = nouveaux
+        soimême.changements = changements
+
+        if soimême.f_changements and (effacés or ajoutés or modifiés):
+            soimême.f_changements(changements)
+
+
+def _colonne_à_liste(colonne: pd.Series) -> list:
+    # Convertit une colonne entière en valeurs Python natives (sérialisables en JSON), sans boucle Python par cellule
+    # sauf pour les dates.
+    type_ = colonne.dtype
+    if pd.api.types.is_datetime64_any_dtype(type_):
+        return colonne.map(pd.Timestamp.isoformat, na_action="ignore").tolist()
+    if isinstance(type_, pd.CategoricalDtype):
+        return colonne.astype(object).tolist()
+    if isinstance(type_, pd.api.extensions.ExtensionDtype):
+        # Types annulables (`Int64`, `boolean`, `string`...)
+        return colonne.to_numpy(dtype=object, na_value=None).tolist()
+    return colonne.to_numpy().tolist()
+
+
+def pandas_à_constellation_par_morceaux(
+        données_pandas: pd.DataFrame,
+        taille_morceau: int = TAILLE_MORCEAU_PANDAS
+) -> Iterator[list[dict[str, Any]]]:
+    colonnes = données_pandas.columns.tolist()
+
+    for i in range(0, len(données_pandas), taille_morceau):
+        morceau = données_pandas.iloc[i:i + taille_morceau]
+        valeurs = [_colonne_à_liste(morceau.iloc[:, j]) for j in range(len(colonnes))]
+        manquantes = morceau.isna().to_numpy()
+
+        if not manquantes.any():
+            yield [dict(zip(colonnes, rangée)) for rangée in zip(*valeurs)]
+        else:
+            yield [
+                {c: v for c, v, m in zip(colonnes, rangée, masque) if not m}
+                for rangée, masque in zip(zip(*valeurs), manquantes.tolist())
+            ]
+
+
 def pandas_à_constellation(données_pandas: pd.DataFrame) -> list[dict[str, Any]]:
     données = []
-    for _, r in données_pandas.iterrows():
-        r_finale = {c: v for c, v in r.to_dict().items() if not pd.isna(v)}
-        données.append(r_finale)
+    for morceau in pandas_à_constellation_par_morceaux(données_pandas):
+        données += morceau
 
     return données
@@ -45,16 +45,20 @@ class Suiveur(object):
         }, ws)
 
     def oublier(soimême, idRequête):
-        soimême.connexions.pop(idRequête)
+        soimême.connexions.pop(idRequête, None)
 
     async def changerValeur(soimême, val):
         soimême.valeur = val
-        for idRequête, ws in soimême.connexions.items():
-            await envoyer_message_à_ws({
-                "type": "suivre",
-                "idRequête": idRequête,
-                "données": soimême.valeur
-            }, ws)
+        for idRequête, ws in list(soimême.connexions.items()):
+            try:
+                await envoyer_message_à_ws({
+                    "type": "suivre",
+                    "idRequête": idRequête,
+                    "données": soimême.valeur
+                }, ws)
+            except ConnectionClosed:
+                # Client déconnecté sans avoir appelé `fOublier`
+                soimême.oublier(idRequête)
 
     def __contains__(soimême, item):
         return item in soimême.connexions
@@ -73,7 +77,7 @@ class Chercheur(object):
         }, ws)
 
     def oublier(soimême, idRequête):
-        soimême.connexions.pop(idRequête)
+        soimême.connexions.pop(idRequête, None)
 
     async def changerTaille(soimême, idRequête: str, taille: int):
         if idRequête not in soimême.connexions:
@@ -112,6 +116,22 @@ async def traiter_message(message, ws: WebSocketConnection):
                 "fonctions": ["fChangerN"]
             }, ws)
             await chercheur.rechercher(message["idRequête"], taille=message["args"]["nRésultatsDésirés"], ws=ws)
+        elif fonction == ("tableaux", "suivreDonnéesExportation"):
+            await envoyer_message_à_ws({
+                "type": "suivrePrêt",
+                "idRequête": message["idRequête"]
+            }, ws)
+            await envoyer_message_à_ws({
+                "type": "suivre",
+                "idRequête": message["idRequête"],
+                "données": {
+                    "nomTableau": message["args"]["idTableau"],
+                    "données": [{"col": i} for i in range(3)],
+                    "fichiersSFIP": []
+                }
+            }, ws)
+        elif fonction == ("suiviMuet",):
+            pass  # Ne répond jamais
         else:
             await envoyer_message_à_ws(erreur_fonction_non_définie(message), ws)
 
@@ -120,6 +140,11 @@ async def traiter_message(message, ws: WebSocketConnection):
         fonction = message["fonction"]
         if fonction == "fChangerN":
             await chercheur.changerTaille(idRequête, taille=message["args"][0])
+        elif fonction == "fOublier":
+            if idRequête in suiveur:
+                suiveur.oublier(idRequête)
+            elif idRequête in chercheur:
+                chercheur.oublier(idRequête)
 
     elif type_ == "oublier":
         idRequête = message["idRequête"]
@@ -146,6 +171,32 @@ async def traiter_message(message, ws: WebSocketConnection):
                 "idRequête": message["idRequête"],
                 "résultat": résultat,
             }, ws)
+        elif fonction == ("tableaux", "ajouterÉlément"):
+            vals = message["args"]["vals"]
+            if "erreur" in vals:
+                await envoyer_message_à_ws({
+                    "type": "erreur",
+                    "idRequête": message["idRequête"],
+                    "erreur": "Valeur invalide."
+                }, ws)
+                return
+            await envoyer_message_à_ws({
+                "type": "action",
+                "idRequête": message["idRequête"],
+                "résultat": "empreinte-" + json.dumps(vals, sort_keys=True),
+            }, ws)
+        elif fonction == ("bavarder",):
+            # Écrit beaucoup sur stdout et stderr, plus que ne peut contenir le tuyau du système d'exploitation
+            for i in range(message["args"]["n"]):
+                print(f"bavardage {i}")
+                print(f"bavardage {i}", file=sys.stderr)
+            sys.stdout.flush()
+            await envoyer_message_à_ws({
+                "type": "action",
+                "idRequête": message["idRequête"],
+            }, ws)
+        elif fonction == ("actionMuette",):
+            pass  # Ne répond jamais
         elif fonction == ("changerValeurSuivie",):
             await suiveur.changerValeur(message["args"]["x"])
             await envoyer_message_à_ws({
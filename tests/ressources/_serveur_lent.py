@@ -0,0 +1,10 @@
+import sys
+import time
+
+# Un faux serveur qui n'est jamais prêt, pour tester les délais de lancement
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["version"]:
+        print("2.0.6")
+    else:
+        print("Lancement...", flush=True)
+        time.sleep(60)
@@ -1,15 +1,23 @@
 import json
+import sys
 import tempfile
 import unittest
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import pandas as pd
 import pandas.testing as pdt
 import trio
+import trio.testing
 
 from constellationPy.client import ouvrir_client, Client
+from constellationPy.serveur import lancer_serveur
+from constellationPy.utils import fais_rien
+from tests.ressources.faux_serveur import dir_serveur
 from tests.utils import Serveur, VRAI_SERVEUR
 
+if sys.version_info < (3, 11):
+    from exceptiongroup import ExceptionGroup
+
 
 class TestClient(TestCase):
     dossier: tempfile.TemporaryDirectory
@@ -48,6 +56,11 @@ class TestClient(TestCase):
             async with ouvrir_client() as client:
                 await client.ce_module_nexiste_pas.ni_cette_fonction()
 
+    async def test_mandataires_réutilisés(soimême):
+        async with ouvrir_client() as client:
+            soimême.assertIs(client.tableaux.ajouter_élément, client.tableaux.ajouter_élément)
+            soimême.assertListEqual(client.tableaux.ajouter_élément._adresse_fonction, ["tableaux", "ajouterÉlément"])
+
     @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
     async def test_suivre(soimême):
         résultat = {}
@@ -64,6 +77,418 @@ class TestClient(TestCase):
             await client.changer_valeur_suivie(x=2)
             soimême.assertNotEqual(résultat["x"], 2)
 
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_décodage_fil(soimême):
+        # Avec un seuil de 0, tous les messages sont décodés dans un fil à part
+        résultats = []
+        async with ouvrir_client(seuil_décodage_fil=0) as client:
+            oublier = await client.fonction_suivi(f=résultats.append)
+            for i in range(5):
+                await client.changer_valeur_suivie(x=i)
+            test = await client.ceci_est_un_test.de_sous_module()
+            await oublier()
+
+        soimême.assertEqual(test, "C'est beau")
+        soimême.assertListEqual(résultats[-5:], list(range(5)))
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_suivre_lent_ne_bloque_pas_actions(soimême):
+        async def traiter_résultat_lentement(x):
+            await trio.sleep(10)
+
+        async with ouvrir_client() as client:
+            oublier = await client.fonction_suivi(f=traiter_résultat_lentement)
+            await client.changer_valeur_suivie(x=3)
+
+            with trio.fail_after(2):
+                id_dispositif = await client.obtIdDispositif()
+            soimême.assertIsInstance(id_dispositif, str)
+
+            await oublier()
+            client.pouponnière.cancel_scope.cancel()
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_suivre_tampon_borné(soimême):
+        reçues = []
+        débloquer = trio.Event()
+
+        async def traiter_résultat(x):
+            await débloquer.wait()
+            reçues.append(x)
+
+        async with ouvrir_client(taille_tampon_suivi=2, rappels_simultanés=1) as client:
+            oublier = await client.fonction_suivi(f=traiter_résultat)
+            for i in range(10):
+                await client.changer_valeur_suivie(x=i)
+            débloquer.set()
+            await trio.sleep(.1)
+            await oublier()
+
+        # Les valeurs intermédiaires sont abandonnées, mais la plus récente est toujours livrée
+        soimême.assertLessEqual(len(reçues), 4)
+        soimême.assertEqual(reçues[-1], 9)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_suivis_partagés(soimême):
+        résultats_1, résultats_2 = [], []
+        async with ouvrir_client() as client:
+            await client.changer_valeur_suivie(x=1)
+            oublier_1 = await client.fonction_suivi(f=résultats_1.append)
+            oublier_2 = await client.fonction_suivi(f=résultats_2.append)
+            with trio.fail_after(2):
+                while not résultats_2:
+                    await trio.sleep(.01)
+
+            # Un seul suivi sur le serveur ; le nouvel abonné reçoit tout de même la valeur présente
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 1)
+            soimême.assertListEqual(résultats_2, [1])
+
+            await client.changer_valeur_suivie(x=2)
+            await oublier_1()
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 1)
+
+            await client.changer_valeur_suivie(x=3)
+            await oublier_2()
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 0)
+            soimême.assertEqual(client.requêtes_en_cours["écouteurs"], 0)
+
+        soimême.assertListEqual(résultats_1, [1, 2])
+        soimême.assertListEqual(résultats_2, [1, 2, 3])
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_suivis_non_partagés(soimême):
+        async with ouvrir_client(partager_suivis=False) as client:
+            oublier_1 = await client.fonction_suivi(f=fais_rien)
+            oublier_2 = await client.fonction_suivi(f=fais_rien)
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 2)
+            await oublier_1()
+            await oublier_2()
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_cache_obt_données_tableau(soimême):
+        async with ouvrir_client(durée_cache=.5) as client:
+            données = await client.obt_données_tableau(id_tableau="abc", patience=.2)
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 1)  # Le suivi reste ouvert
+
+            # La deuxième lecture est immédiate, sans nouveau suivi
+            with trio.fail_after(.1):
+                encore = await client.obt_données_tableau(id_tableau="abc", patience=.2)
+            pdt.assert_frame_equal(données, encore)
+            pdt.assert_frame_equal(données, pd.DataFrame({"col": [0, 1, 2]}))
+
+            # Le suivi est oublié après `durée_cache` secondes sans lecture
+            await trio.sleep(.7)
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 0)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_obt_données_tableau_simultanées(soimême):
+        # Chaque lecture consomme ses données en morceaux ; elle ne doit donc jamais partager son suivi
+        résultats = []
+
+        async def lire():
+            résultats.append(await client.obt_données_tableau(id_tableau="abc", patience=.1))
+
+        with mock.patch("constellationPy.client.TAILLE_MORCEAU_PANDAS", 1):
+            async with ouvrir_client() as client:
+                async with trio.open_nursery() as pouponnière:
+                    pouponnière.start_soon(lire)
+                    pouponnière.start_soon(lire)
+
+        for données in résultats:
+            pdt.assert_frame_equal(données, pd.DataFrame({"col": [0, 1, 2]}))
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_cache_éviction(soimême):
+        async with ouvrir_client(durée_cache=10, taille_max_cache=1) as client:
+            await client.obt_données_tableau(id_tableau="abc", patience=.1)
+            await client.obt_données_tableau(id_tableau="def", patience=.1)
+            await trio.testing.wait_all_tasks_blocked()
+
+            # Seule la lecture la plus récente est gardée
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 1)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_cache_éviction_lecture_en_attente(soimême):
+        # Une lecture qui attend encore une valeur stable n'est pas évincée par une lecture plus rapide
+        résultats = {}
+
+        async def lire(id_tableau, patience):
+            résultats[id_tableau] = await client.obt_données_tableau(id_tableau=id_tableau, patience=patience)
+
+        async with ouvrir_client(durée_cache=10, taille_max_cache=1) as client:
+            async with trio.open_nursery() as pouponnière:
+                pouponnière.start_soon(lire, "abc", 1)
+                await trio.sleep(.1)
+                pouponnière.start_soon(lire, "def", .1)
+
+        soimême.assertSetEqual(set(résultats), {"abc", "def"})
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_plusieurs_connexions(soimême):
+        résultats_1, résultats_2 = [], []
+        async with ouvrir_client(n_connexions=3, partager_suivis=False) as client:
+            oublier_1 = await client.fonction_suivi(f=résultats_1.append)
+            oublier_2 = await client.fonction_suivi(f=résultats_2.append)
+
+            # Les actions passent par la connexion principale, les suivis sont répartis entre les autres
+            soimême.assertListEqual([c["suivis"] for c in client.statistiques_connexions], [0, 1, 1])
+
+            await client.changer_valeur_suivie(x=10)
+            with trio.fail_after(2):
+                while not (résultats_1 and résultats_1[-1] == 10 and résultats_2 and résultats_2[-1] == 10):
+                    await trio.sleep(.01)
+
+            await oublier_1()
+            await oublier_2()
+            statistiques = client.statistiques_connexions
+            soimême.assertListEqual([c["suivis"] for c in statistiques], [0, 0, 0])
+            soimême.assertTrue(all(c["messages_reçus"] > 0 for c in statistiques))
+
+            # Les suivis ont bien été oubliés par le serveur
+            await client.changer_valeur_suivie(x=11)
+            await trio.sleep(.1)
+            soimême.assertNotIn(11, résultats_1 + résultats_2)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_itérer_dernière(soimême):
+        async with ouvrir_client() as client:
+            async with client.fonction_suivi.itérer() as valeurs:
+                for i in range(10):
+                    await client.changer_valeur_suivie(x=i)
+                await trio.sleep(.1)
+
+                # Seule la valeur la plus récente est gardée
+                soimême.assertEqual(await valeurs.receive(), 9)
+                soimême.assertEqual(valeurs.statistics().current_buffer_used, 0)
+
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 0)
+            soimême.assertEqual(client.requêtes_en_cours["écouteurs"], 0)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_itérer_bloquer(soimême):
+        reçues = []
+        async with ouvrir_client() as client:
+            async with client.fonction_suivi.itérer(politique="bloquer") as valeurs:
+                for i in range(100, 105):
+                    await client.changer_valeur_suivie(x=i)
+
+                with trio.fail_after(2):
+                    async for valeur in valeurs:
+                        reçues.append(valeur)
+                        if valeur == 104:
+                            break
+
+        # Aucune valeur n'est abandonnée
+        soimême.assertListEqual(reçues[-5:], list(range(100, 105)))
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_itérer_bloquer_tampon_plein(soimême):
+        reçues = []
+        async with ouvrir_client(taille_tampon_suivi=2) as client:
+            async with client.fonction_suivi.itérer(politique="bloquer", taille=1) as valeurs:
+                for i in range(100, 110):
+                    await client.changer_valeur_suivie(x=i)
+                await trio.sleep(.2)
+
+                with trio.fail_after(2):
+                    async for valeur in valeurs:
+                        reçues.append(valeur)
+                        if valeur == 109:
+                            break
+        reçues = reçues[1:]  # La première valeur est celle du suivi au moment de son lancement
+
+        # Au-delà de `taille` + `taille_tampon_suivi` valeurs en attente, les plus anciennes sont abandonnées, mais la
+        # plus récente est toujours livrée
+        soimême.assertLess(len(reçues), 10)
+        soimême.assertEqual(reçues[-1], 109)
+        soimême.assertListEqual(reçues, sorted(reçues))
+
+    async def test_itérer_politique_inconnue(soimême):
+        async with ouvrir_client() as client:
+            with soimême.assertRaises(ValueError):
+                async with client.fonction_suivi.itérer(politique="n'importe quoi"):
+                    pass
+
+    async def test_actions_fusionnées(soimême):
+        résultats = []
+
+        async def obt_id(client):
+            résultats.append(await client.obtIdDispositif())
+
+        async with ouvrir_client(fonctions_fusionnables=["obt_id_dispositif"]) as client:
+            async with trio.open_nursery() as pouponnière:
+                for _ in range(10):
+                    pouponnière.start_soon(obt_id, client)
+
+            soimême.assertEqual(client.n_actions_fusionnées, 9)
+            soimême.assertEqual(len(set(résultats)), 1)
+
+            # Sans appels simultanés, rien n'est fusionné (pas de mémo par défaut)
+            await client.obtIdDispositif()
+            soimême.assertEqual(client.n_actions_fusionnées, 9)
+
+    async def test_actions_mémo(soimême):
+        async with ouvrir_client(fonctions_fusionnables=["obtIdDispositif"], durée_mémo=.3) as client:
+            id_dispositif = await client.obtIdDispositif()
+            soimême.assertEqual(await client.obtIdDispositif(), id_dispositif)
+            soimême.assertEqual(client.n_actions_fusionnées, 1)
+
+            await trio.sleep(.4)
+            await client.obtIdDispositif()
+            soimême.assertEqual(client.n_actions_fusionnées, 1)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_en_lot(soimême):
+        async with ouvrir_client() as client:
+            résultats = await client.en_lot([
+                ("obtIdDispositif", {}),
+                ("ceci_est_un_test.de_sous_module", {}),
+                ("cette_fonction_nexiste_pas", {}),
+                *[("obt_id_dispositif", {})] * 20,
+            ], fenêtre=5)
+            même_fonction = await client.ceci_est_un_test.de_sous_module.en_lot([{}, {}])
+
+        soimême.assertEqual(len(résultats), 23)
+        soimême.assertEqual(résultats[0], "1234567890")
+        soimême.assertEqual(résultats[1], "C'est beau")
+        soimême.assertIsInstance(résultats[2], AttributeError)
+        soimême.assertListEqual(résultats[3:], ["1234567890"] * 20)
+        soimême.assertListEqual(même_fonction, ["C'est beau"] * 2)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_ajouter_données_tableau(soimême):
+        données = pd.DataFrame({"a": range(25), "b": ["x", None] * 12 + [None]})
+        progrès = []
+
+        async with ouvrir_client() as client:
+            empreintes = await client.ajouter_données_tableau(
+                "/orbitdb/tableau", données, taille_morceau=10, fenêtre=4, f_progrès=progrès.append
+            )
+
+        soimême.assertEqual(len(empreintes), 25)
+        soimême.assertEqual(empreintes[0], 'empreinte-{"a": 0, "b": "x"}')
+        soimême.assertEqual(empreintes[1], 'empreinte-{"a": 1}')
+        soimême.assertListEqual([p["faits"] for p in progrès], [10, 20, 25])
+        soimême.assertTrue(all(p["total"] == 25 and p["débit"] > 0 for p in progrès))
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_ajouter_données_tableau_erreur(soimême):
+        async with ouvrir_client() as client:
+            with soimême.assertRaises(ExceptionGroup) as é:
+                await client.ajouter_données_tableau(
+                    "/orbitdb/tableau", [{"a": 1}, {"erreur": 1}, {"a": 2}], taille_morceau=2
+                )
+        soimême.assertEqual(len(é.exception.exceptions), 1)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_délai_action(soimême):
+        async with ouvrir_client(délai=.2) as client:
+            with soimême.assertRaises(trio.TooSlowError):
+                await client.action_muette()
+            # Délai spécifique à un appel
+            with soimême.assertRaises(trio.TooSlowError):
+                await client.action_muette(_délai=.1)
+
+            soimême.assertDictEqual(
+                client.requêtes_en_cours, {"actions": 0, "suivis": 0, "écouteurs": 0, "expirées": 2}
+            )
+            soimême.assertIsInstance(await client.obtIdDispositif(), str)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_délai_suivi(soimême):
+        async with ouvrir_client() as client:
+            with soimême.assertRaises(trio.TooSlowError):
+                await client.suivi_muet(f=print, _délai=.2)
+            soimême.assertEqual(client.requêtes_en_cours["écouteurs"], 0)
+            soimême.assertEqual(client.requêtes_en_cours["suivis"], 0)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_annulation_nettoie_écouteurs(soimême):
+        async with ouvrir_client() as client:
+            with trio.move_on_after(.1):
+                await client.action_muette()
+            soimême.assertEqual(client.requêtes_en_cours["écouteurs"], 0)
+            soimême.assertEqual(client.requêtes_en_cours["expirées"], 0)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_reconnexion(soimême):
+        def lancer():
+            return lancer_serveur(port=5011, autoinstaller=False, exe=[sys.executable, dir_serveur])
+
+        processus, port, code_secret = lancer()
+        résultats = []
+        try:
+            async with ouvrir_client(port, code_secret, reconnecter=True, délai_reconnexion=.1) as client:
+                oublier = await client.fonction_suivi(f=résultats.append)
+
+                # Redémarrer le serveur
+                processus.terminate()
+                processus.wait()
+                processus, _, _ = lancer()
+
+                with trio.fail_after(10):
+                    await client.changer_valeur_suivie(x=5)
+                    while not résultats or résultats[-1] != 5:
+                        await trio.sleep(.05)
+                await oublier()
+        finally:
+            processus.terminate()
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_reconnexion_perdue_pendant_relance(soimême):
+        def lancer():
+            return lancer_serveur(port=5026, autoinstaller=False, exe=[sys.executable, dir_serveur])
+
+        processus, port, code_secret = lancer()
+        résultats = []
+        try:
+            async with ouvrir_client(port, code_secret, reconnecter=True, délai_reconnexion=.1) as client:
+                oublier = await client.fonction_suivi(f=résultats.append)
+
+                # La première connexion rétablie est perdue avant que les suivis n'aient été relancés
+                ouvrir_connexion = client._ouvrir_connexion
+                n_connexions = 0
+
+                async def ouvrir_puis_perdre():
+                    nonlocal n_connexions
+                    ws = await ouvrir_connexion()
+                    n_connexions += 1
+                    if n_connexions == 1:
+                        await ws.aclose()
+                    return ws
+
+                client._ouvrir_connexion = ouvrir_puis_perdre
+
+                processus.terminate()
+                processus.wait()
+                processus, _, _ = lancer()
+
+                with trio.fail_after(10):
+                    await client.changer_valeur_suivie(x=5)
+                    while not résultats or résultats[-1] != 5:
+                        await trio.sleep(.05)
+                soimême.assertGreater(n_connexions, 1)
+                await oublier()
+        finally:
+            processus.terminate()
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_connexion_perdue_sans_reconnexion(soimême):
+        processus, port, code_secret = lancer_serveur(
+            port=5012, autoinstaller=False, exe=[sys.executable, dir_serveur]
+        )
+        try:
+            with soimême.assertRaises(ExceptionGroup):
+                async with ouvrir_client(port, code_secret) as client:
+                    processus.terminate()
+                    processus.wait()
+                    with trio.fail_after(5):
+                        # Échoue au lieu d'attendre à jamais
+                        await trio.sleep(.2)
+                        await client.obtIdDispositif()
+        finally:
+            processus.terminate()
+
     @unittest.skipIf(not VRAI_SERVEUR, "Test uniquement pour le vrai serveur.")
     async def test_suivre_données(soimême):
         async with ouvrir_client() as client:
@@ -0,0 +1,89 @@
+import sys
+import unittest
+from unittest import TestCase
+
+import trio
+
+from constellationPy.grappe import ouvrir_grappe
+from constellationPy.serveur import lancer_serveur
+from tests.ressources.faux_serveur import dir_serveur
+from tests.utils import VRAI_SERVEUR
+
+
+def lancer(port: int):
+    return lancer_serveur(port=port, autoinstaller=False, exe=[sys.executable, dir_serveur])
+
+
+@unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+class TestGrappe(TestCase):
+    async def test_répartition(soimême):
+        processus = [lancer(5013), lancer(5014)]
+        try:
+            async with ouvrir_grappe([(port, code) for _, port, code in processus]) as grappe:
+                nœuds = [grappe._nœud_pour(f"id{i}") for i in range(50)]
+                soimême.assertSetEqual(set(nœuds), {0, 1})
+
+                # Toujours le même nœud pour un même identifiant
+                soimême.assertListEqual(nœuds, [grappe._nœud_pour(f"id{i}") for i in range(50)])
+
+                soimême.assertIsInstance(await grappe.obt_id_dispositif(id_test="id1"), str)
+        finally:
+            for p, _, _ in processus:
+                p.terminate()
+
+    async def test_basculement(soimême):
+        processus = [lancer(5015), lancer(5016)]
+        résultats = []
+        try:
+            async with ouvrir_grappe(
+                    [(port, code) for _, port, code in processus], intervalle_santé=.1, délai_santé=.5
+            ) as grappe:
+                # Un identifiant lu sur le nœud 1 (le nœud 0 est le nœud d'écriture)
+                identifiant = next(f"id{i}" for i in range(100) if grappe._nœud_pour(f"id{i}") == 1)
+                oublier = await grappe.fonction_suivi(id_test=identifiant, f=résultats.append)
+
+                processus[1][0].terminate()
+                processus[1][0].wait()
+                with trio.fail_after(5):
+                    while grappe.santé[1]:
+                        await trio.sleep(.05)
+
+                # Les lectures et les suivis passent maintenant par le nœud 0
+                soimême.assertIsInstance(await grappe.obt_id_dispositif(id_test=identifiant), str)
+                await grappe.changer_valeur_suivie(x=7)
+                with trio.fail_after(5):
+                    while not résultats or résultats[-1] != 7:
+                        await trio.sleep(.05)
+                await oublier()
+        finally:
+            for p, _, _ in processus:
+                p.terminate()
+
+    async def test_basculement_par_lecture(soimême):
+        processus = [lancer(5024), lancer(5025)]
+        résultats = []
+        try:
+            # La surveillance est trop lente pour remarquer la perte du nœud ; c'est une lecture qui s'en aperçoit
+            async with ouvrir_grappe(
+                    [(port, code) for _, port, code in processus], intervalle_santé=60, délai_lecture=.5
+            ) as grappe:
+                identifiant = next(f"id{i}" for i in range(100) if grappe._nœud_pour(f"id{i}") == 1)
+                oublier = await grappe.fonction_suivi(id_test=identifiant, f=résultats.append)
+
+                processus[1][0].terminate()
+                processus[1][0].wait()
+
+                # La lecture n'attend pas indéfiniment la reconnexion au nœud tombé
+                with trio.fail_after(5):
+                    soimême.assertIsInstance(await grappe.obt_id_dispositif(id_test=identifiant), str)
+                soimême.assertFalse(grappe.santé[1])
+
+                # Et les suivis du nœud tombé ont été déplacés
+                await grappe.changer_valeur_suivie(x=7)
+                with trio.fail_after(5):
+                    while not résultats or résultats[-1] != 7:
+                        await trio.sleep(.05)
+                await oublier()
+        finally:
+            for p, _, _ in processus:
+                p.terminate()
@@ -1,9 +1,29 @@
+import json
 import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
 from unittest import TestCase
 
+import trio
+
 from constellationPy.client import ouvrir_client
-from constellationPy.serveur import obtenir_contexte, ErreurConnexionContexteExistant, obtenir_port_contexte
-from tests.utils import Serveur
+from constellationPy.sync import ClientSync
+from constellationPy.serveur import obtenir_contexte, ErreurConnexionContexteExistant, obtenir_port_contexte, \
+    lancer_serveur, JournalServeur, ouvrir_serveur, cache_installation, obt_version_serveur, \
+    Serveur as ServeurConstellation, _processus_vivant
+from tests.ressources.faux_serveur import dir_serveur
+from tests.utils import Serveur, VRAI_SERVEUR
+
+if sys.version_info < (3, 11):
+    from exceptiongroup import ExceptionGroup
+
+dir_serveur_lent = os.path.join(os.path.dirname(dir_serveur), "_serveur_lent.py")
+dir_racine = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -34,3 +54,188 @@ class TestServeur(TestCase):
             port_serveur = serveur.port
             port_contexte = obtenir_port_contexte()
             soimême.assertEqual(port_serveur, port_contexte)
+
+    def test_serveurs_simultanés_fils(soimême):
+        résultats = {}
+
+        def f_fil(port):
+            with Serveur(port):
+                with ClientSync() as client:
+                    résultats[port] = (obtenir_port_contexte(), client._client.port, client.obtIdDispositif())
+
+        fils = [threading.Thread(target=f_fil, args=(port,)) for port in [5020, 5021]]
+        for fil in fils:
+            fil.start()
+        for fil in fils:
+            fil.join()
+
+        soimême.assertDictEqual(résultats, {
+            5020: (5020, 5020, "1234567890"),
+            5021: (5021, 5021, "1234567890")
+        })
+        soimême.assertIsNone(obtenir_port_contexte())
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_serveurs_simultanés_tâches(soimême):
+        ports = {}
+        serveurs = {}
+
+        async def f_tâche(port, task_status=trio.TASK_STATUS_IGNORED):
+            async with ouvrir_serveur(port=port, autoinstaller=False, exe=[sys.executable, dir_serveur]) as serveur:
+                async with ouvrir_client() as client:
+                    ports[port] = client.port
+                serveurs[port] = serveur
+                task_status.started()
+                await trio.sleep_forever()
+
+        async with trio.open_nursery() as pouponnière:
+            for port in [5022, 5023]:
+                await pouponnière.start(f_tâche, port)
+
+            # Aucun serveur dans le contexte de cette tâche-ci ; on les désigne explicitement
+            soimême.assertIsNone(obtenir_port_contexte())
+            async with ouvrir_client(serveur=serveurs[5023]) as client:
+                soimême.assertEqual(client.port, 5023)
+                soimême.assertEqual(await client.obtIdDispositif(), "1234567890")
+
+            client_sync = ClientSync(serveur=serveurs[5022])
+            soimême.assertEqual(await trio.to_thread.run_sync(client_sync.obtIdDispositif), "1234567890")
+
+            pouponnière.cancel_scope.cancel()
+
+        soimême.assertDictEqual(ports, {5022: 5022, 5023: 5023})
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_journal_serveur(soimême):
+        journal = JournalServeur(taille=100, niveau_logging=None)
+
+        # Les deux flux partagent le même journal ; les lignes de l'un peuvent donc effacer celles de l'autre
+        dernières = {}
+        ajouter = journal.ajouter
+
+        def f_ajouter(flux, ligne):
+            dernières[flux] = ligne.rstrip("\r\n")
+            ajouter(flux, ligne)
+
+        journal.ajouter = f_ajouter
+        processus, port, code_secret = lancer_serveur(
+            port=5017, autoinstaller=False, exe=[sys.executable, dir_serveur], journal=journal
+        )
+        try:
+            async with ouvrir_client(port, code_secret) as client:
+                # Le serveur ne bloque pas, même s'il écrit plus que ne peut contenir le tuyau
+                with trio.fail_after(10):
+                    await client.bavarder(n=50_000)
+
+            with trio.fail_after(5):
+                while dernières != {"stdout": "bavardage 49999", "stderr": "bavardage 49999"}:
+                    await trio.sleep(.05)
+            soimême.assertEqual(len(journal.lignes), 100)
+        finally:
+            processus.terminate()
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    async def test_ouvrir_serveur(soimême):
+        progrès = []
+        async with ouvrir_serveur(
+                port=5018, autoinstaller=False, exe=[sys.executable, dir_serveur], délai=10, f_progrès=progrès.append
+        ) as serveur:
+            soimême.assertEqual(obtenir_port_contexte(), 5018)
+            async with ouvrir_client() as client:
+                soimême.assertIsInstance(await client.obtIdDispositif(), str)
+        soimême.assertIsNone(obtenir_port_contexte())
+        soimême.assertIsNotNone(serveur.serveur.returncode)
+        soimême.assertTrue(any("NŒUD PRÊT" in p["ligne"] for p in progrès))
+
+    async def test_délai_lancement_async(soimême):
+        début = time.monotonic()
+        # Comme pour `ouvrir_client`, les erreurs sont soulevées de la pouponnière, dans un `ExceptionGroup`
+        with soimême.assertRaises(ExceptionGroup) as e:
+            async with ouvrir_serveur(autoinstaller=False, exe=[sys.executable, dir_serveur_lent], délai=.5):
+                pass
+        soimême.assertIsNotNone(e.exception.subgroup(TimeoutError))
+        soimême.assertLess(time.monotonic() - début, 5)
+        soimême.assertIsNone(obtenir_port_contexte())
+
+    def test_délai_lancement(soimême):
+        journal = JournalServeur(niveau_logging=None)
+        début = time.monotonic()
+        with soimême.assertRaises(TimeoutError):
+            lancer_serveur(autoinstaller=False, exe=[sys.executable, dir_serveur_lent], délai=.5, journal=journal)
+        soimême.assertLess(time.monotonic() - début, 5)
+        soimême.assertListEqual(journal.obtenir("stdout"), ["Lancement..."])
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur.")
+    def test_serveur_partagé(soimême):
+        with tempfile.TemporaryDirectory() as dossier:
+            fichier = os.path.join(dossier, "découverte.json")
+            argsmc = {
+                "port": 5019, "autoinstaller": False, "exe": [sys.executable, dir_serveur], "partager": True,
+                "fichier_découverte": fichier
+            }
+
+            # Un autre processus lance le nœud partagé...
+            code = "\n".join([
+                "import json, sys",
+                "from constellationPy.serveur import Serveur",
+                "with Serveur(**json.loads(sys.argv[1])) as s:",
+                "    print(json.dumps([s.port, s.serveur is None]), flush=True)",
+                "    sys.stdin.readline()"
+            ])
+            lanceur = subprocess.Popen(
+                [sys.executable, "-c", code, json.dumps(argsmc)], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                text=True, cwd=dir_racine
+            )
+            soimême.assertListEqual(json.loads(lanceur.stdout.readline()), [5019, False])
+
+            # ... auquel on se joint plutôt que d'en lancer un nouveau
+            with ServeurConstellation(**argsmc) as serveur:
+                soimême.assertIsNone(serveur.serveur)
+                soimême.assertEqual(serveur.port, 5019)
+                with open(fichier, encoding="utf-8") as d:
+                    soimême.assertEqual(len(json.load(d)["utilisateurs"]), 2)
+                if os.name == "posix":
+                    # Le fichier de découverte contient le code secret du nœud
+                    soimême.assertEqual(os.stat(fichier).st_mode & 0o777, 0o600)
+
+                # Le nœud survit au départ du processus qui l'a lancé, même s'il écrit beaucoup par la suite
+                lanceur.communicate("\n", timeout=10)
+                client = ClientSync(serveur=serveur)
+                client.bavarder(n=20_000)
+                soimême.assertEqual(client.obtIdDispositif(), "1234567890")
+                with open(fichier, encoding="utf-8") as d:
+                    soimême.assertListEqual(json.load(d)["utilisateurs"], [os.getpid()])
+
+            # Le dernier utilisateur arrête le nœud
+            soimême.assertFalse(os.path.exists(fichier))
+            début = time.monotonic()
+            while _processus_vivant(serveur.pid) and time.monotonic() - début < 5:
+                time.sleep(.05)
+            soimême.assertFalse(_processus_vivant(serveur.pid))
+
+class TestCacheInstallation(TestCase):
+    def setUp(soimême):
+        soimême.dossier = tempfile.TemporaryDirectory()
+        soimême.fichier_original = cache_installation.fichier
+        cache_installation.fichier = os.path.join(soimême.dossier.name, "installation.json")
+
+    def tearDown(soimême):
+        cache_installation.fichier = soimême.fichier_original
+        soimême.dossier.cleanup()
+
+    def test_cache_version_serveur(soimême):
+        exe = [sys.executable, dir_serveur_lent]
+        soimême.assertEqual(str(obt_version_serveur(exe)), "2.0.6")
+
+        # La version suivante vient du cache, et non du serveur
+        clef = next(iter(cache_installation._lire()))
+        entrée = cache_installation._lire()[clef]
+        cache_installation.changer(clef, {**entrée, "version": "9.9.9"})
+        soimême.assertEqual(str(obt_version_serveur(exe)), "9.9.9")
+
+        # Modifier le fichier du serveur invalide le cache
+        os.utime(dir_serveur_lent, (time.time(), os.stat(dir_serveur_lent).st_mtime + 1))
+        soimême.assertEqual(str(obt_version_serveur(exe)), "2.0.6")
+
+        cache_installation.effacer()
+        soimême.assertDictEqual(cache_installation._lire(), {})
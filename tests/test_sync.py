@@ -1,3 +1,4 @@
+import sys
 import unittest
 
 import pandas as pd
@@ -6,6 +7,9 @@ import pandas.testing as pdt
 from constellationPy import ClientSync, fais_rien
 from tests.utils import Serveur, VRAI_SERVEUR
 
+if sys.version_info < (3, 11):
+    from exceptiongroup import ExceptionGroup
+
 
 class TestSync(unittest.TestCase):
     serveur: Serveur
@@ -162,6 +166,72 @@ class TestSync(unittest.TestCase):
         réf = pd.DataFrame({id_col: [123], "auteur": idCompte})
         pdt.assert_frame_equal(données, réf)
 
+    def test_client_persistant(soimême):
+        with ClientSync() as client:
+            id_orbite = client.obtIdDispositif()
+            connexion = client._client.connexion
+
+            soimême.assertEqual(client.obt_id_dispositif(), id_orbite)
+            soimême.assertIs(client._client.connexion, connexion)
+        soimême.assertFalse(client.ouvert)
+
+    def test_client_persistant_erreur(soimême):
+        with ClientSync() as client:
+            with soimême.assertRaises(ExceptionGroup):
+                client.cette_fonction_nexiste_pas()
+
+            # La connexion reste utilisable après une erreur
+            soimême.assertIsInstance(client.obtIdDispositif(), str)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur")
+    def test_en_lot_sync(soimême):
+        résultats = soimême.client.ceci_est_un_test.en_lot([("de_sous_module", {})] * 3)
+        soimême.assertListEqual(résultats, ["C'est beau"] * 3)
+
+        with ClientSync() as client:
+            résultats = client.en_lot([("obtIdDispositif", {}), ("cette_fonction_nexiste_pas", {})])
+        soimême.assertIsInstance(résultats[0], str)
+        soimême.assertIsInstance(résultats[1], AttributeError)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur")
+    def test_ajouter_données_tableau_sync(soimême):
+        progrès = []
+        empreintes = soimême.client.ajouter_données_tableau(
+            "/orbitdb/tableau", pd.DataFrame({"a": [1, 2, 3]}), taille_morceau=2, f_progrès=progrès.append
+        )
+        soimême.assertListEqual(empreintes, [f'empreinte-{{"a": {i}}}' for i in [1, 2, 3]])
+        soimême.assertEqual(len(progrès), 2)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur")
+    def test_client_persistant_suivre(soimême):
+        with ClientSync() as client:
+            client.changer_valeur_suivie(x=4)
+            résultat = client.fonction_suivi(f=fais_rien)
+        soimême.assertEqual(résultat, 4)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur")
+    def test_itérer_sync(soimême):
+        with ClientSync() as client:
+            client.changer_valeur_suivie(x=1)
+            reçues = []
+            for valeur in client.fonction_suivi.itérer(politique="bloquer"):
+                reçues.append(valeur)
+                if valeur == 1:
+                    client.changer_valeur_suivie(x=2)
+                elif valeur == 2:
+                    break
+
+            soimême.assertListEqual(reçues, [1, 2])
+            # Le suivi a été oublié à la fermeture du générateur
+            soimême.assertEqual(client._client.requêtes_en_cours["suivis"], 0)
+
+    @unittest.skipIf(VRAI_SERVEUR, "Test uniquement pour le faux serveur")
+    def test_itérer_sync_non_persistant(soimême):
+        soimême.client.changer_valeur_suivie(x=5)
+        générateur = soimême.client.fonction_suivi.itérer()
+        soimême.assertEqual(next(générateur), 5)
+        générateur.close()
+        soimême.assertFalse(soimême.client.ouvert)
 
     @classmethod
     def tearDownClass(cls) -> None:
@@ -1,11 +1,13 @@
-from unittest import TestCase
+from unittest import TestCase, mock
 
 import pandas as pd
 import pandas.testing as pdt
 import trio
 
+from constellationPy import utils
 from constellationPy.utils import à_chameau, à_kebab, une_fois_sans_oublier, tableau_à_pandas, pandas_à_constellation, \
-    une_fois, attendre_stabilité
+    pandas_à_constellation_par_morceaux, \
+    une_fois, attendre_stabilité, TableauVivant, empreinte_valeur, tableau_exporté_à_pandas, sérialiser, désérialiser, choisir_moteur_json
 
 
 class TestUtils(TestCase):
@@ -17,6 +19,25 @@ class TestUtils(TestCase):
         kebab = à_kebab("suivreDonnéesTableau")
         soimême.assertEqual(kebab, "suivre_données_tableau")
 
+    def test_sérialiser(soimême):
+        moteur_original = utils.moteur_json
+        moteurs = ["json", "orjson"] if utils.orjson else ["json"]
+        val = {"données": [{"é": 1, "b": None}], "fichiersSFIP": {"a"}, "texte": "Précipitation"}
+        try:
+            for moteur in moteurs:
+                with soimême.subTest(moteur=moteur):
+                    choisir_moteur_json(moteur)
+                    texte = sérialiser(val)
+                    soimême.assertIsInstance(texte, str)
+                    soimême.assertIn("Précipitation", texte)
+                    soimême.assertEqual(désérialiser(texte), {**val, "fichiersSFIP": ["a"]})
+        finally:
+            choisir_moteur_json(moteur_original)
+
+    def test_moteur_json_inconnu(soimême):
+        with soimême.assertRaises(ValueError):
+            choisir_moteur_json("yaml")
+
     async def test_une_fois_sans_oublier(soimême):
         async with trio.open_nursery() as pouponnière:
             async def f_async(f, task_status=trio.TASK_STATUS_IGNORED):
@@ -90,6 +111,65 @@ class TestUtils(TestCase):
         soimême.assertFalse(vals["a"])
         soimême.assertTrue(vals["b"])
 
+    async def test_attendre_stabilité_délai_max(soimême):
+        vals = {}
+        attendre_stable = attendre_stabilité(10, délai_max=0.2)
+
+        async def f(x: str):
+            vals[x] = await attendre_stable(x)
+
+        with trio.fail_after(1):
+            async with trio.open_nursery() as pouponnière:
+                for x in "abc":
+                    pouponnière.start_soon(f, x)
+                    await trio.sleep(0.05)
+
+        # Malgré une patience de 10 secondes, on accepte la dernière valeur après 0,2 secondes
+        soimême.assertDictEqual(vals, {"a": False, "b": False, "c": True})
+
+    async def test_attendre_stabilité_adaptative(soimême):
+        attendre_stable = attendre_stabilité(10, n_min=0.05)
+
+        async def f(x: str):
+            return await attendre_stable(x)
+
+        with trio.fail_after(1):
+            async with trio.open_nursery() as pouponnière:
+                pouponnière.start_soon(f, "a")
+                await trio.sleep(0.02)
+                # Les mises à jour arrivent vite ; l'attente est donc courte
+                soimême.assertTrue(await f("b"))
+                pouponnière.cancel_scope.cancel()
+
+    def test_empreinte_valeur(soimême):
+        tableau = [{"empreinte": "abc", "données": {"a": 1}}, {"empreinte": "def", "données": {"a": 2}}]
+        soimême.assertEqual(empreinte_valeur(tableau), empreinte_valeur([dict(x) for x in tableau]))
+        soimême.assertNotEqual(empreinte_valeur(tableau), empreinte_valeur(tableau[:1]))
+        soimême.assertEqual(empreinte_valeur({"a": [1, 2]}), empreinte_valeur({"a": [1, 2]}))
+        soimême.assertNotEqual(empreinte_valeur({"a": [1, 2]}), empreinte_valeur({"a": [1, 3]}))
+
+        # Tableau exporté : haché par morceaux de rangées, sans sérialiser l'ensemble
+        exporté = {"nomTableau": "t", "données": [{"col": i} for i in range(3)], "fichiersSFIP": []}
+        with mock.patch("constellationPy.utils.sérialiser", wraps=sérialiser) as f_sérialiser, \
+                mock.patch("constellationPy.utils.TAILLE_MORCEAU_EMPREINTE", 2):
+            empreinte = empreinte_valeur(exporté)
+            sérialisés = [appel.args[0] for appel in f_sérialiser.call_args_list]
+            soimême.assertFalse(any(
+                isinstance(x, dict) and len(x) > 1 or isinstance(x, list) and len(x) > 2 for x in sérialisés
+            ))
+            soimême.assertEqual(empreinte, empreinte_valeur(dict(reversed(list(exporté.items())))))
+            soimême.assertNotEqual(empreinte, empreinte_valeur({**exporté, "données": [{"col": i} for i in range(4)]}))
+
+    def test_tableau_exporté_à_pandas_par_morceaux(soimême):
+        rangées = [{"a": i, "b": str(i)} if i % 3 else {"a": i} for i in range(10)]
+        réf = tableau_exporté_à_pandas({"données": list(rangées), "fichiersSFIP": set(), "nomTableau": "t"})
+
+        tableau = {"données": list(rangées), "fichiersSFIP": set(), "nomTableau": "t"}
+        données_pandas = tableau_exporté_à_pandas(tableau, taille_morceau=3, consommer=True)
+
+        pdt.assert_frame_equal(données_pandas, réf)
+        soimême.assertListEqual(tableau["données"], [])
+
     def test_tableau_à_pandas(soimême):
         tableau = [{"empreinte": "abc", "données": {"a": 1, "b": 2}}, {"empreinte": "def", "données": {"a": 3}}]
         données_pandas = tableau_à_pandas(tableau)
@@ -107,3 +187,52 @@ class TestUtils(TestCase):
         référence = [{"a": 1, "b": 2}, {"a": 3}]
 
         soimême.assertListEqual(données_constellation, référence)
+
+    def test_pandas_à_constellation_types(soimême):
+        données_pandas = pd.DataFrame({
+            "entier": pd.array([1, None, 3], dtype="Int64"),
+            "réel": [1.5, 2.0, None],
+            "catégorie": pd.Categorical(["a", None, "b"]),
+            "date": pd.to_datetime(["2024-01-02", None, "2024-03-04 05:06:07"], format="ISO8601"),
+            "bool": pd.array([True, False, None], dtype="boolean"),
+        })
+        données_constellation = pandas_à_constellation(données_pandas)
+
+        référence = [
+            {"entier": 1, "réel": 1.5, "catégorie": "a", "date": "2024-01-02T00:00:00", "bool": True},
+            {"réel": 2.0, "bool": False},
+            {"entier": 3, "catégorie": "b", "date": "2024-03-04T05:06:07"},
+        ]
+        soimême.assertListEqual(données_constellation, référence)
+        soimême.assertIs(type(données_constellation[0]["entier"]), int)
+
+    def test_pandas_à_constellation_par_morceaux(soimême):
+        données_pandas = pd.DataFrame({"a": range(5)})
+        morceaux = list(pandas_à_constellation_par_morceaux(données_pandas, taille_morceau=2))
+        soimême.assertListEqual(morceaux, [[{"a": 0}, {"a": 1}], [{"a": 2}, {"a": 3}], [{"a": 4}]])
+
+    def test_tableau_vivant(soimême):
+        changements = []
+        tableau = TableauVivant(f_changements=changements.append)
+
+        tableau.mettre_à_jour([{"empreinte": "abc", "données": {"a": 1}}, {"empreinte": "def", "données": {"a": 2}}])
+        pdt.assert_frame_equal(tableau.données, pd.DataFrame({"a": [1, 2]}, index=["abc", "def"]))
+
+        tableau.mettre_à_jour([
+            {"empreinte": "def", "données": {"a": 2, "b": 3}},
+            {"empreinte": "ghi", "données": {"a": 4}}
+        ])
+        soimême.assertListEqual(changements[-1]["effacés"], ["abc"])
+        soimême.assertListEqual(changements[-1]["modifiés"].index.tolist(), ["def"])
+        soimême.assertListEqual(changements[-1]["ajoutés"].index.tolist(), ["ghi"])
+        pdt.assert_frame_equal(
+            tableau.données.sort_index(),
+            pd.DataFrame({"a": [2, 4], "b": [3, None]}, index=["def", "ghi"])
+        )
+
+        # Aucun changement, aucun appel
+        tableau.mettre_à_jour([
+            {"empreinte": "def", "données": {"a": 2, "b": 3}},
+            {"empreinte": "ghi", "données": {"a": 4}}
+        ])
+        soimême.assertEqual(len(changements), 2)